@@ -0,0 +1,219 @@
+# Name: embylistsbuild
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+import configparser
+import logging
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+from embylistsemby import EmbyClient, itemRecord, listLines, writeList
+from embylistslog import LOG_FORMATS, LogWriter
+from embylistsstate import readState, writeState
+
+# the lists built when the INI has no [EMBY:<list>] sections
+DEFAULT_LISTS = {
+    'movieslist': ('Movie', ''),
+    'serieslist': ('Series', ''),
+}
+
+
+class ELBU():
+    """Builds the list files from the Items API of the Emby server.
+
+    The items of every list are cached in the config directory. A run
+    only asks the server for the items saved since the previous one,
+    plus their total count to notice removed items, and walks the whole
+    library when the count is off or FULL_REFRESH hours have passed.
+    """
+
+    def __init__(self, config_dir=None, log_dir=None):
+        logging.basicConfig(
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            level=logging.INFO)
+        # allow directory overrides via arguments or environment variables
+        config_dir = config_dir or os.getenv(
+            "EMBYLISTS_CONFIG_DIR", "/config/")
+        app_dir = os.getenv("EMBYLISTS_APP_DIR", "/app/")
+        log_dir = log_dir or os.getenv("EMBYLISTS_LOG_DIR", "/var/log/")
+
+        self.config_file = "embylists.ini"
+        self.exampleconfigfile = "embylists.ini.example"
+        self.log_file = "embylistsbuild.log"
+
+        # use pathlib for paths
+        self.config_dir = Path(config_dir)
+        self.config_filePath = Path(config_dir) / self.config_file
+        self.log_filePath = Path(log_dir) / self.log_file
+
+        # ensure config exists
+        try:
+            if not self.config_filePath.exists():
+                logging.error(
+                    f"Can't open file {self.config_filePath}, "
+                    "creating example INI file."
+                )
+                src = Path(app_dir) / self.exampleconfigfile
+                dst = Path(config_dir) / self.exampleconfigfile
+                # ensure destination directory exists
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(str(src), str(dst))
+                sys.exit(1)
+
+            try:
+                self.config = configparser.ConfigParser()
+                self.config.read(self.config_filePath)
+
+                # EMBY
+                self.server_url = self.config.get(
+                    'EMBY', 'SERVER_URL', fallback=''
+                )
+                self.api_key = self.config.get(
+                    'EMBY', 'API_KEY', fallback=''
+                )
+                self.user_id = self.config.get(
+                    'EMBY', 'USER_ID', fallback=''
+                )
+                self.page_size = self.config.getint(
+                    'EMBY', 'PAGE_SIZE', fallback=500
+                )
+                self.full_refresh = self.config.getint(
+                    'EMBY', 'FULL_REFRESH', fallback=24
+                )
+                if not self.server_url:
+                    raise ValueError("SERVER_URL is missing in [EMBY]")
+
+                # one [EMBY:<list>] section per list file
+                self.lists = {}
+                for section in self.config.sections():
+                    if not section.startswith('EMBY:'):
+                        continue
+                    name = section[len('EMBY:'):].strip()
+                    if not name:
+                        raise ValueError(f"Empty list name [{section}]")
+                    self.lists[name] = (
+                        self.config.get(
+                            section, 'ITEM_TYPES', fallback='Movie'),
+                        self.config.get(section, 'PARENT_ID', fallback=''),
+                    )
+                if not self.lists:
+                    self.lists = dict(DEFAULT_LISTS)
+
+                # LOG
+                self.log_format = self.config.get(
+                    'LOG', 'FORMAT', fallback='TEXT'
+                ).upper()
+                if self.log_format not in LOG_FORMATS:
+                    raise ValueError(
+                        f"FORMAT must be one of {LOG_FORMATS}"
+                    )
+
+            except (KeyError, ValueError) as e:
+                logging.error(
+                    f"Invalid INI contents or type error: {e}. "
+                    "Exiting."
+                )
+                sys.exit(1)
+
+        except (IOError, FileNotFoundError) as e:
+            logging.error(f"I/O error while checking config: {e}")
+            sys.exit(1)
+
+        self.log = LogWriter(self.log_filePath, self.log_format == 'JSON')
+
+        self.client = EmbyClient(
+            self.server_url, self.api_key, self.user_id, self.page_size
+        )
+
+    def writeLog(self, init, msg, **fields):
+        self.log.write(msg, init, **fields)
+
+    def run(self):
+        for name, (item_types, parent_id) in self.lists.items():
+            try:
+                self.build(name, item_types, parent_id)
+            except (OSError, ValueError) as e:
+                # the previous list files stay in place
+                logging.error(f"EmbyLists - Can't build {name}: {e}")
+                self.writeLog(
+                    False, f"EmbyLists - Can't build {name}: {e}\n",
+                    action='build_failed', list=name
+                )
+
+        self.log.close()
+
+    def build(self, name, item_types, parent_id):
+        started = time.monotonic()
+        requests = self.client.requests
+
+        cache_filePath = self.config_dir / f"embylistsbuild.{name}.cache"
+        cache = readState(cache_filePath)
+        query = [self.server_url, self.user_id, item_types, parent_id]
+
+        items = cache.get('items', {})
+        walked = cache.get('walked', 0)
+        full = cache.get('query') != query or \
+            time.time() - walked >= self.full_refresh * 3600
+
+        changed = 0
+        if not full:
+            for item in self.client.items(
+                    item_types, parent_id, cache.get('saved')):
+                if item.get('Id'):
+                    items[item['Id']] = itemRecord(item)
+                    changed += 1
+            # the items saved since the previous run don't tell which
+            # ones were removed, the total count does
+            if self.client.count(item_types, parent_id) != len(items):
+                logging.info(
+                    f"EmbyLists - Items were removed from {name}, "
+                    "walking the library.")
+                full = True
+
+        if full:
+            items = {
+                item['Id']: itemRecord(item)
+                for item in self.client.items(item_types, parent_id)
+                if item.get('Id')
+            }
+            walked = time.time()
+            changed = len(items)
+
+        writeState(cache_filePath, {
+            'query': query,
+            'walked': walked,
+            'saved': max(
+                (record[4] for record in items.values()), default=''),
+            'items': items,
+        })
+
+        newest, alphabetical = listLines(list(items.values()))
+        written = writeList(self.config_dir / f"{name}.txt", newest)
+        writeList(
+            self.config_dir / f"{name}_alphabetical.txt", alphabetical)
+
+        seconds = round(time.monotonic() - started, 3)
+        logging.info(
+            f"EmbyLists - Built {name}: {len(items)} titles, "
+            f"{changed} fetched in {self.client.requests - requests} "
+            f"requests, {seconds}s"
+            + ("" if written else ", unchanged")
+        )
+        self.writeLog(
+            False,
+            f"EmbyLists - Built {name}: {len(items)} titles, "
+            f"{changed} fetched.\n",
+            action='build', list=name, titles=len(items), fetched=changed,
+            full=full, changed=written, seconds=seconds
+        )
+
+
+if __name__ == '__main__':
+
+    embylistsbuild = ELBU()
+    embylistsbuild.run()
+    embylistsbuild = None
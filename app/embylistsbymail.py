@@ -0,0 +1,328 @@
+# Name: embylistsbymail
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+import argparse
+import imaplib
+import logging
+import sys
+import json
+import shutil
+import os
+from pathlib import Path
+
+from embylistscommands import Dispatcher
+from embylistsconfig import loadSnapshot, saveSnapshot, snapshotKey
+from embylistshandler import LIST_TYPES, ListHandler
+from embylistsimap import watchMailbox
+from embylistslog import LOG_FORMATS, LogWriter
+from embylistsmetrics import Metrics
+from embylistspushover import PushoverQueue
+from embylistsscan import processMailbox
+from embylistssmtp import SMTPPool
+
+
+class ELBE():
+
+    def __init__(self, config_dir=None, log_dir=None):
+        logging.basicConfig(
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            level=logging.INFO)
+        # allow directory overrides via arguments or environment variables
+        config_dir = config_dir or os.getenv(
+            "EMBYLISTS_CONFIG_DIR", "/config/")
+        app_dir = os.getenv("EMBYLISTS_APP_DIR", "/app/")
+        log_dir = log_dir or os.getenv("EMBYLISTS_LOG_DIR", "/var/log/")
+
+        self.config_file = "embylists.ini"
+        self.exampleconfigfile = "embylists.ini.example"
+        self.log_file = "embylistsbymail.log"
+        self.state_file = "embylistsbymail.state"
+        self.settings_file = "embylistsbymail.settings"
+
+        # use pathlib for paths
+        self.config_filePath = Path(config_dir) / self.config_file
+        self.log_filePath = Path(log_dir) / self.log_file
+        self.state_filePath = Path(config_dir) / self.state_file
+        self.settings_filePath = Path(config_dir) / self.settings_file
+
+        # ensure config exists
+        try:
+            if not self.config_filePath.exists():
+                logging.error(
+                    f"Can't open file {self.config_filePath}, "
+                    "creating example INI file."
+                )
+                src = Path(app_dir) / self.exampleconfigfile
+                dst = Path(config_dir) / self.exampleconfigfile
+                # ensure destination directory exists
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(str(src), str(dst))
+                sys.exit(1)
+
+            try:
+                self.loadConfig(config_dir)
+
+            except (KeyError, ValueError) as e:
+                logging.error(
+                    f"Invalid INI contents or type error: {e}. "
+                    "Exiting."
+                )
+                sys.exit(1)
+
+        except (IOError, FileNotFoundError) as e:
+            logging.error(f"I/O error while checking config: {e}")
+            sys.exit(1)
+
+        # the log file stays open and is flushed at the end of every run
+        self.log = LogWriter(
+            self.log_filePath, self.log_format == 'JSON',
+            self.log_max_size * 1024 * 1024, self.log_max_age * 3600,
+            self.log_backups
+        )
+
+        # timings and counters of every run, for all list types
+        self.metrics = Metrics(
+            'embylistsbymail', self.metrics_textfile, self.nodename)
+
+        # SMTP sessions for the replies of all list types, one per worker
+        self.smtp = SMTPPool(
+            self.mail_server, self.mail_port,
+            self.mail_login, self.mail_password,
+            self.smtp_idle_timeout, self.workers
+        )
+
+        # one push per run for the replies of all list types
+        self.pushover = PushoverQueue(
+            self.pushover_token_api, self.pushover_user_key,
+            self.pushover_sound, metrics=self.metrics
+        )
+
+        # one handler per configured list type, each reads its own section
+        self.handlers = [
+            ListHandler(LIST_TYPES[section], config_dir, log_dir)
+            for section in self.sections
+        ]
+        for handler in self.handlers:
+            handler.smtp = self.smtp
+            handler.pushover = self.pushover
+            handler.metrics = self.metrics
+
+        # the subjects of all list types, resolved with one lookup
+        self.dispatcher = Dispatcher()
+        for handler in self.handlers:
+            handler.registerCommands(self.dispatcher)
+
+    def loadConfig(self, config_dir):
+        """Set the settings of this script from embylists.ini.
+
+        The validated settings are stored in a snapshot, later runs use
+        it instead of parsing the INI until the INI, this script or one
+        of the modules in SETTINGS_MODULES changes.
+        """
+        key = snapshotKey([self.config_filePath, Path(__file__)])
+        settings = loadSnapshot(self.settings_filePath, key)
+        if settings is None:
+            settings = self.readConfig(config_dir)
+            saveSnapshot(self.settings_filePath, key, settings)
+
+        vars(self).update(settings)
+
+    def readConfig(self, config_dir):
+        """Parse and validate embylists.ini, return the settings it set."""
+        import configparser
+
+        before = set(vars(self))
+
+        config = configparser.ConfigParser()
+        config.read(self.config_filePath)
+
+        # GENERAL
+        self.dry_run = config.getboolean(
+            'GENERAL', 'DRY_RUN', fallback=False
+        )
+        self.verbose_logging = config.getboolean(
+            'GENERAL', 'VERBOSE_LOGGING', fallback=False
+        )
+        self.workers = config.getint(
+            'GENERAL', 'WORKERS', fallback=4
+        )
+        if self.workers < 1:
+            raise ValueError("WORKERS must be at least 1")
+
+        # NODE
+        self.nodename = config.get(
+            'NODE', 'NODE_NAME', fallback=''
+        )
+
+        # MAIL
+        self.mail_port = config.getint(
+            'MAIL', 'MAIL_PORT', fallback=0
+        )
+        self.mail_server = config.get(
+            'MAIL', 'MAIL_SERVER', fallback=''
+        )
+        self.mail_imap_port = config.getint(
+            'MAIL', 'MAIL_IMAP_PORT', fallback=imaplib.IMAP4_SSL_PORT
+        )
+        self.mail_login = config.get(
+            'MAIL', 'MAIL_LOGIN', fallback=''
+        )
+        self.mail_password = config.get(
+            'MAIL', 'MAIL_PASSWORD', fallback=''
+        )
+        self.server_search = config.getboolean(
+            'MAIL', 'SERVER_SEARCH', fallback=True
+        )
+        self.search_senders = config.getboolean(
+            'MAIL', 'SEARCH_SENDERS', fallback=False
+        )
+        self.fetch_batch_size = config.getint(
+            'MAIL', 'FETCH_BATCH_SIZE', fallback=500
+        )
+        self.smtp_idle_timeout = config.getint(
+            'MAIL', 'SMTP_IDLE_TIMEOUT', fallback=60
+        )
+        self.archive_folder = config.get(
+            'MAIL', 'ARCHIVE_FOLDER', fallback=''
+        )
+
+        # PUSHOVER
+        self.pushover_user_key = config.get(
+            'PUSHOVER', 'USER_KEY', fallback=''
+        )
+        self.pushover_token_api = config.get(
+            'PUSHOVER', 'TOKEN_API', fallback=''
+        )
+        self.pushover_sound = config.get(
+            'PUSHOVER', 'SOUND', fallback='pushover'
+        )
+
+        # METRICS
+        self.metrics_textfile = config.get(
+            'METRICS', 'TEXTFILE', fallback=''
+        )
+        self.metrics_summary = config.getboolean(
+            'METRICS', 'SUMMARY', fallback=True
+        )
+        self.metrics_port = config.getint(
+            'METRICS', 'PORT', fallback=0
+        )
+
+        # LOG
+        self.log_format = config.get(
+            'LOG', 'FORMAT', fallback='TEXT'
+        ).upper()
+        if self.log_format not in LOG_FORMATS:
+            raise ValueError(
+                f"FORMAT must be one of {LOG_FORMATS}"
+            )
+        self.log_max_size = config.getint(
+            'LOG', 'MAX_SIZE', fallback=10
+        )
+        self.log_max_age = config.getint(
+            'LOG', 'MAX_AGE', fallback=0
+        )
+        self.log_backups = config.getint(
+            'LOG', 'BACKUPS', fallback=5
+        )
+
+        # the list types configured in the INI
+        self.sections = [
+            section for section in LIST_TYPES
+            if config.has_section(section)
+        ]
+
+        settings = {
+            name: value for name, value in vars(self).items()
+            if name not in before
+        }
+
+        return settings
+
+    def writeLog(self, init, msg, **fields):
+        self.log.write(msg, init, **fields)
+
+    def close(self):
+        self.log.close()
+        for handler in self.handlers:
+            handler.log.close()
+
+    def setup(self):
+        for handler in self.handlers:
+            handler.setup()
+
+    def connect(self):
+        with self.metrics.span('login'):
+            # create an IMAP4 class with SSL
+            imap = imaplib.IMAP4_SSL(
+                self.mail_server, self.mail_imap_port)
+            # authenticate
+            imap.login(self.mail_login, self.mail_password)
+
+        return imap
+
+    def run(self):
+        self.setup()
+
+        imap = self.connect()
+        self.process(imap)
+
+        # close the connections and logout
+        self.smtp.close()
+        imap.close()
+        imap.logout()
+        self.pushover.close()
+        self.report()
+        self.close()
+
+    def daemon(self):
+        self.setup()
+
+        if self.metrics_port:
+            self.metrics.serve(self.metrics_port)
+
+        logging.info("EmbyLists - Waiting for new mail (IDLE).")
+        try:
+            watchMailbox(self.connect, self.cycle)
+        finally:
+            self.pushover.close()
+            self.close()
+
+    def cycle(self, imap):
+        self.process(imap)
+        self.report()
+
+    def report(self):
+        summary = self.metrics.finish()
+
+        if self.metrics_summary:
+            logging.info(f"EmbyLists - Run summary {json.dumps(summary)}")
+            self.writeLog(
+                False, f"EmbyLists - Run summary {json.dumps(summary)}\n",
+                action='summary', **summary
+            )
+            self.log.flush()
+
+    def process(self, imap):
+        processMailbox(self, imap, self.handlers, "EmbyLists")
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--daemon', action='store_true',
+        help="keep running and wait for new mail with IMAP IDLE")
+    args = parser.parse_args()
+
+    embylistsbyemail = ELBE()
+    try:
+        if args.daemon:
+            embylistsbyemail.daemon()
+        else:
+            embylistsbyemail.run()
+    except KeyboardInterrupt:
+        pass
+    embylistsbyemail = None
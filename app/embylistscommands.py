@@ -0,0 +1,74 @@
+# Name: embylistscommands
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""Maps mail subjects to the handler and command they ask for."""
+
+import logging
+
+# send the whole list
+LIST = 'LIST'
+
+
+def normalizeSubject(subject):
+    """Return subject case folded, with its whitespace collapsed."""
+    return ' '.join(subject.casefold().split())
+
+
+def parseKeywords(text):
+    """Return the normalized keywords in a comma separated text."""
+    return [
+        normalizeSubject(keyword) for keyword in text.split(',')
+        if keyword.strip()
+    ]
+
+
+class Dispatcher():
+    """Resolves a subject with dict lookups instead of a scan per command.
+
+    Exact keywords ("movies", "series new") match the whole subject.
+    Prefix keywords ("search") match the first words of the subject, the
+    rest of the subject is the command argument.
+    """
+
+    def __init__(self):
+        self.exact = {}
+        self.prefixes = {}
+        self.max_words = 0
+
+    def add(self, keyword, target, command=LIST, prefix=False):
+        keyword = normalizeSubject(keyword)
+        if not keyword:
+            return
+
+        table = self.prefixes if prefix else self.exact
+        if keyword in table and table[keyword][0] is not target:
+            logging.warning(
+                f"Keyword '{keyword}' is used twice, keeping the first.")
+            return
+        table.setdefault(keyword, (target, command))
+
+        if prefix:
+            self.max_words = max(self.max_words, len(keyword.split(' ')))
+
+    def keywords(self):
+        """Return every keyword, for the server side subject search."""
+        return list(self.exact) + list(self.prefixes)
+
+    def resolve(self, subject):
+        """Return (target, command, argument), or None for other mail."""
+        subject = normalizeSubject(subject)
+
+        hit = self.exact.get(subject)
+        if hit is not None:
+            return hit[0], hit[1], ''
+
+        if self.prefixes:
+            words = subject.split(' ')
+            for count in range(min(self.max_words, len(words) - 1), 0, -1):
+                hit = self.prefixes.get(' '.join(words[:count]))
+                if hit is not None:
+                    return hit[0], hit[1], ' '.join(words[count:])
+
+        return None
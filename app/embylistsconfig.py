@@ -0,0 +1,50 @@
+# Name: embylistsconfig
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""Validated settings of embylists.ini, kept while the INI is unchanged.
+
+A script parses and validates the INI once and stores the resulting
+settings as a small JSON snapshot. Later runs load the snapshot instead,
+until the INI, the script or a module that parses or validates the
+settings changes on disk (mtime or size), or SNAPSHOT_VERSION changes.
+"""
+
+import importlib
+
+from embylistspayload import fileKey
+from embylistsstate import readState, writeState
+
+# raise when the stored settings change shape
+SNAPSHOT_VERSION = 1
+
+# the modules the scripts read and validate their settings with
+SETTINGS_MODULES = (
+    'embylistscommands', 'embylistsconfig', 'embylistsdelivery',
+    'embylistshandler', 'embylistslog', 'embylistssenders',
+    'embyliststiers',
+)
+
+
+def snapshotKey(paths):
+    """Return what identifies the settings read from the files in paths."""
+    paths = list(paths) + [
+        importlib.import_module(name).__file__ for name in SETTINGS_MODULES
+    ]
+
+    # JSON has no tuples, the stored key comes back as lists
+    return [SNAPSHOT_VERSION] + [list(entry) for entry in fileKey(paths)]
+
+
+def loadSnapshot(snapshot_filePath, key):
+    """Return the settings stored under key, or None if they are stale."""
+    snapshot = readState(snapshot_filePath)
+    if snapshot.get('key') != key:
+        return None
+
+    return snapshot.get('settings')
+
+
+def saveSnapshot(snapshot_filePath, key, settings):
+    writeState(snapshot_filePath, {'key': key, 'settings': settings})
@@ -0,0 +1,74 @@
+# Name: embylistscooldown
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""Limits how often a sender gets a list."""
+
+import threading
+import time
+from datetime import datetime
+
+from embylistsstate import readState, writeState
+
+
+class Cooldown():
+    """Remembers when every sender was last sent a list.
+
+    A sender asking again within seconds of that reply is throttled. The
+    times are kept in a JSON state file, so they hold across runs.
+    seconds 0 turns the cooldown off.
+    """
+
+    def __init__(self, state_filePath, seconds):
+        self.state_filePath = state_filePath
+        self.seconds = seconds
+        self.lock = threading.Lock()
+
+    def lastSent(self, sender, now=None):
+        """Return when sender got a list, if that is within the cooldown."""
+        if not self.seconds:
+            return None
+
+        now = time.time() if now is None else now
+        with self.lock:
+            sent_at = readState(self.state_filePath).get(sender.lower())
+
+        if sent_at is not None and now - sent_at < self.seconds:
+            return sent_at
+
+        return None
+
+    def record(self, sender, now=None):
+        """Remember that sender was sent a list now."""
+        if not self.seconds:
+            return
+
+        now = time.time() if now is None else now
+        with self.lock:
+            sent = readState(self.state_filePath)
+            # drop the senders whose cooldown is over
+            sent = {
+                address: sent_at for address, sent_at in sent.items()
+                if now - sent_at < self.seconds
+            }
+            sent[sender.lower()] = now
+            writeState(self.state_filePath, sent)
+
+
+def cooldownBody(sent_at, seconds):
+    """Return the Dutch mail text for a throttled request."""
+    sent = datetime.fromtimestamp(sent_at)
+    again = datetime.fromtimestamp(sent_at + seconds)
+    today = datetime.now().date()
+
+    sent_text = f"om {sent:%H:%M}" if sent.date() == today \
+        else f"op {sent:%d-%m-%Y} om {sent:%H:%M}"
+    again_text = f"{again:%H:%M}" if again.date() == today \
+        else f"{again:%d-%m-%Y %H:%M}"
+
+    return (
+        f"Hi,\n\nJe lijst is {sent_text} al verstuurd. Een nieuwe lijst "
+        f"kan je vanaf {again_text} weer aanvragen.\n\n"
+        "Fijne dag!\n\n"
+    )
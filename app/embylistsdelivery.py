@@ -0,0 +1,251 @@
+# Name: embylistsdelivery
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""Compressed and "changes only" delivery of the lists."""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from embylistspayload import PayloadCache
+from embylistsstate import readState, writeState
+
+# valid values for DELIVERY in the list sections
+DELIVERY_MODES = ('FULL', 'GZIP', 'ZIP', 'DELTA')
+
+
+def compressedParts(paths, mode):
+    """Return MIME attachments holding the files in paths, compressed.
+
+    ZIP puts all files in one archive named after the first file, GZIP
+    attaches every file as its own .gz.
+    """
+    # imported here, only the GZIP and ZIP modes need them
+    import gzip
+    import io
+    import zipfile
+    from email.mime.application import MIMEApplication
+
+    paths = [Path(path) for path in paths]
+
+    if mode == 'ZIP':
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for path in paths:
+                archive.write(path, path.name)
+        part = MIMEApplication(buffer.getvalue(), 'zip')
+        part.add_header(
+            'Content-Disposition',
+            'attachment', filename=f"{paths[0].stem}.zip"
+        )
+        return [part]
+
+    parts = []
+    for path in paths:
+        with open(path, 'rb') as listfile:
+            data = gzip.compress(listfile.read(), mtime=0)
+        part = MIMEApplication(data, 'gzip')
+        part.add_header(
+            'Content-Disposition',
+            'attachment', filename=f"{path.name}.gz"
+        )
+        parts.append(part)
+
+    return parts
+
+
+def hashFile(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as listfile:
+        for chunk in iter(lambda: listfile.read(1024 * 1024), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def readLines(path):
+    with open(path, 'r', encoding='utf-8', errors='replace') as listfile:
+        return [line.rstrip('\n') for line in listfile if line.strip()]
+
+
+def countLines(path):
+    with open(path, 'r', encoding='utf-8', errors='replace') as listfile:
+        return sum(1 for line in listfile if line.strip())
+
+
+def diffLines(old, new):
+    """Return the (added, removed) lines between two list versions."""
+    old_set = set(old)
+    new_set = set(new)
+
+    added = [line for line in new if line not in old_set]
+    removed = [line for line in old if line not in new_set]
+
+    return added, removed
+
+
+class DeltaDelivery():
+    """Remembers which list version every recipient got last.
+
+    A copy of each delivered version is kept under its SHA-256 in
+    snapshot_dir, so the next request can be answered with the titles
+    that were added and removed since.
+    """
+
+    def __init__(self, state_filePath, snapshot_dir):
+        self.state_filePath = Path(state_filePath)
+        self.snapshot_dir = Path(snapshot_dir)
+        # hashes and lines are only recomputed when a list changes
+        self.cache = PayloadCache()
+        self.lock = threading.Lock()
+
+    def listHash(self, list_filePath):
+        return self.cache.get(
+            ('hash', str(list_filePath)), [list_filePath],
+            lambda: hashFile(list_filePath)
+        )
+
+    def listLines(self, list_filePath):
+        return self.cache.get(
+            ('lines', str(list_filePath)), [list_filePath],
+            lambda: readLines(list_filePath)
+        )
+
+    def listCount(self, list_filePath):
+        return self.cache.get(
+            ('count', str(list_filePath)), [list_filePath],
+            lambda: countLines(list_filePath)
+        )
+
+    def snapshotLines(self, list_hash):
+        try:
+            return readLines(self.snapshot_dir / f"{list_hash}.txt")
+        except IOError:
+            return None
+
+    def current(self, receiver, list_filePath):
+        """Return (hash, titles) when receiver has the current version.
+
+        Returns None when receiver never got list_filePath or got an
+        older version. The hash is computed once per version of the file.
+        """
+        with self.lock:
+            deliveries = readState(self.state_filePath)
+        old_hash = deliveries.get(receiver.lower(), {}).get(
+            Path(list_filePath).name)
+        if old_hash is None:
+            return None
+
+        try:
+            if self.listHash(list_filePath) != old_hash:
+                return None
+            return old_hash, self.listCount(list_filePath)
+        except IOError:
+            return None
+
+    def changes(self, receiver, list_filePath):
+        """Return (added, removed) since the last delivery to receiver.
+
+        Returns None when there is nothing to compare with, the caller
+        should then send the full list.
+        """
+        with self.lock:
+            deliveries = readState(self.state_filePath)
+        old_hash = deliveries.get(receiver.lower(), {}).get(
+            Path(list_filePath).name)
+        if old_hash is None:
+            return None
+
+        try:
+            if self.listHash(list_filePath) == old_hash:
+                return [], []
+            new = self.listLines(list_filePath)
+        except IOError:
+            return None
+
+        old = self.snapshotLines(old_hash)
+        if old is None:
+            return None
+
+        return diffLines(old, new)
+
+    def record(self, receiver, list_filePath):
+        """Remember that receiver now has the current list_filePath."""
+        # one worker at a time, so prune() can't remove a snapshot that
+        # another one has written but not recorded yet
+        with self.lock:
+            try:
+                list_hash = self.listHash(list_filePath)
+                snapshot = self.snapshot_dir / f"{list_hash}.txt"
+                if not snapshot.exists():
+                    # hash the copy itself, the list may have changed
+                    data = Path(list_filePath).read_bytes()
+                    list_hash = hashlib.sha256(data).hexdigest()
+                    self.storeSnapshot(list_hash, data)
+            except IOError as e:
+                logging.error(f"Can't store list snapshot: {e}")
+                return
+
+            deliveries = readState(self.state_filePath)
+            deliveries.setdefault(receiver.lower(), {})[
+                Path(list_filePath).name] = list_hash
+            writeState(self.state_filePath, deliveries)
+            self.prune(deliveries)
+
+    def storeSnapshot(self, list_hash, data):
+        snapshot = self.snapshot_dir / f"{list_hash}.txt"
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(
+            dir=str(self.snapshot_dir), prefix=f".{snapshot.name}.",
+            suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as snapshotfile:
+                snapshotfile.write(data)
+            os.replace(tmp, snapshot)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def prune(self, deliveries):
+        # drop the versions no recipient has anymore
+        keep = {
+            list_hash for lists in deliveries.values()
+            for list_hash in lists.values()
+        }
+        try:
+            for snapshot in self.snapshot_dir.glob('*.txt'):
+                if snapshot.stem not in keep:
+                    snapshot.unlink()
+        except OSError as e:
+            logging.warning(f"Can't prune list snapshots: {e}")
+
+
+def deltaBody(added, removed):
+    """Return the Dutch mail text for a list of changes."""
+    if not added and not removed:
+        return (
+            "Hi,\n\nEr is niets veranderd sinds je vorige aanvraag.\n\n"
+            "Fijne dag!\n\n"
+        )
+
+    body = "Wijzigingen sinds je vorige aanvraag.\n\n"
+    if added:
+        body += f"Nieuw ({len(added)}):\n" + "\n".join(added) + "\n\n"
+    if removed:
+        body += f"Verwijderd ({len(removed)}):\n" + "\n".join(removed) + "\n"
+
+    return body
+
+
+def currentBody(list_hash, titles):
+    """Return the Dutch mail text for a list the recipient already has."""
+    return (
+        f"Hi,\n\nJe lijst is nog actueel (versie {list_hash[:12]}, "
+        f"{titles} titels).\n\n"
+        "Fijne dag!\n\n"
+    )
@@ -0,0 +1,147 @@
+# Name: embylistsemby
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""Reads library items from the Items API of an Emby server."""
+
+import json
+import os
+import tempfile
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+# the item fields the lists are built from
+FIELDS = 'ProductionYear,SortName,DateCreated,DateLastSaved'
+
+
+class EmbyClient():
+    """Pages through /Items, optionally only the items saved since a date."""
+
+    def __init__(self, server_url, api_key, user_id='', page_size=500,
+                 timeout=30):
+        self.server_url = server_url.rstrip('/')
+        self.api_key = api_key
+        self.user_id = user_id
+        self.page_size = max(1, page_size)
+        self.timeout = timeout
+        self.requests = 0
+
+    def get(self, params):
+        path = f"/emby/Users/{self.user_id}/Items" if self.user_id \
+            else "/emby/Items"
+        request = urllib.request.Request(
+            f"{self.server_url}{path}?{urllib.parse.urlencode(params)}",
+            headers={
+                'X-Emby-Token': self.api_key,
+                'Accept': 'application/json',
+            }
+        )
+        self.requests += 1
+        with urllib.request.urlopen(request, timeout=self.timeout) as reply:
+            return json.load(reply)
+
+    def query(self, item_types, parent_id=''):
+        params = {
+            'Recursive': 'true',
+            'IncludeItemTypes': item_types,
+            'EnableImages': 'false',
+            'EnableUserData': 'false',
+        }
+        if parent_id:
+            params['ParentId'] = parent_id
+
+        return params
+
+    def count(self, item_types, parent_id=''):
+        """Return the number of items, without fetching them."""
+        params = self.query(item_types, parent_id)
+        params['Limit'] = 0
+
+        return self.get(params).get('TotalRecordCount', 0)
+
+    def items(self, item_types, parent_id='', min_saved=None):
+        """Yield the items, or only those saved at min_saved or later."""
+        params = self.query(item_types, parent_id)
+        params.update({
+            'Fields': FIELDS,
+            'SortBy': 'SortName',
+            'SortOrder': 'Ascending',
+            'Limit': self.page_size,
+        })
+        if min_saved:
+            params['MinDateLastSaved'] = min_saved
+
+        start = 0
+        while True:
+            params['StartIndex'] = start
+            page = self.get(params)
+            items = page.get('Items') or []
+            yield from items
+
+            start += len(items)
+            if not items or start >= page.get('TotalRecordCount', 0):
+                break
+
+
+def itemRecord(item):
+    """Return what the lists need of an API item, as a JSON-able list."""
+    return [
+        item.get('Name') or '',
+        item.get('ProductionYear'),
+        item.get('SortName') or item.get('Name') or '',
+        item.get('DateCreated') or '',
+        item.get('DateLastSaved') or '',
+    ]
+
+
+def itemTitle(record):
+    name, year = record[0], record[1]
+    return f"{name} ({year})" if year else name
+
+
+def listLines(records):
+    """Return (newest first, alphabetical) title lines of records."""
+    newest = sorted(records, key=lambda record: record[3], reverse=True)
+    alphabetical = sorted(
+        records, key=lambda record: (record[2].casefold(), record[1] or 0))
+
+    return (
+        [itemTitle(record) for record in newest],
+        [itemTitle(record) for record in alphabetical],
+    )
+
+
+def writeList(path, lines):
+    """Atomically replace the list file path with lines.
+
+    Returns False when the file already held exactly these lines. It is
+    then left alone, so its mtime still tells the replies cached for it
+    that the list hasn't changed.
+    """
+    path = Path(path)
+    data = ''.join(f"{line}\n" for line in lines).encode('utf-8')
+
+    try:
+        if path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(
+        dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as listfile:
+            listfile.write(data)
+            listfile.flush()
+            os.fsync(listfile.fileno())
+        # mkstemp creates the file private, lists are read by others too
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+    return True
@@ -0,0 +1,802 @@
+# Name: embylistshandler
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""The list types and the handler that sends a list type by mail.
+
+embylistsmoviesbymail.py and embylistsseriesbymail.py run one
+ListHandler each, embylistsbymail.py one per list type in LIST_TYPES.
+"""
+
+import imaplib
+import logging
+import sys
+import json
+import shutil
+import os
+import time
+from pathlib import Path
+
+from functools import partial
+from socket import gaierror
+
+from embylistscommands import LIST, Dispatcher, parseKeywords
+from embylistsconfig import loadSnapshot, saveSnapshot, snapshotKey
+from embylistscooldown import Cooldown, cooldownBody
+from embylistsdelivery import (
+    DELIVERY_MODES, DeltaDelivery, compressedParts, currentBody, deltaBody
+)
+from embylistsimap import watchMailbox
+from embylistslog import LOG_FORMATS, LogWriter
+from embylistsmetrics import Metrics
+from embylistspayload import PayloadCache, stampTo
+from embylistspushover import PushoverQueue
+from embylistsscan import processMailbox
+from embylistssearch import SEARCH, SearchIndex, searchBody
+from embylistssenders import SenderIndex
+from embylistssmtp import (
+    SMTPPool, UnavailableError, UndeliverableError, messageError,
+    permanentError
+)
+from embyliststiers import dumpTiers, loadTiers, restoreTiers, tierRules
+
+
+class ListType():
+    """What sets a list type apart: its section, files and wording.
+
+    script names the log, state and other files of the list type and
+    its metrics job. regular and dv are the (list file, attachment
+    files) of the REGULAR and DV tiers, subject the default subject.
+    prefix starts the log lines, title and noun name the list in the
+    Pushover messages and the log.
+    """
+
+    def __init__(
+            self, section, script, regular, dv, subject, prefix, title,
+            noun):
+        self.section = section
+        self.script = script
+        self.regular = regular
+        self.dv = dv
+        self.subject = subject
+        self.prefix = prefix
+        self.title = title
+        self.noun = noun
+
+
+MOVIES = ListType(
+    'MOVIES', 'embylistsmoviesbymail',
+    ("movieslist.txt", ["movieslist_alphabetical.txt"]),
+    ("moviesdvlist.txt", ["moviesdvlist_alphabetical.txt"]),
+    "Movie Lijst - {node}", "MoviesList", "Movies", "movie"
+)
+
+SERIES = ListType(
+    'SERIES', 'embylistsseriesbymail',
+    ("serieslist.txt", []), ("seriesdvlist.txt", []),
+    "Series Lijst - {node}", "SeriesList", "Series", "serie"
+)
+
+# the list types, keyed on their INI section. A new list type only
+# needs an entry here.
+LIST_TYPES = {list_type.section: list_type for list_type in (MOVIES, SERIES)}
+
+
+class ListHandler():
+    """Sends one list type to the senders that ask for it.
+
+    list_type names the INI section of the list type, its files and the
+    wording of its log lines. Standalone it scans the mailbox itself,
+    embylistsbymail.py runs one per list type from a shared scan.
+    """
+
+    def __init__(self, list_type, config_dir=None, log_dir=None):
+        logging.basicConfig(
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            level=logging.INFO)
+        # allow directory overrides via arguments or environment variables
+        config_dir = config_dir or os.getenv(
+            "EMBYLISTS_CONFIG_DIR", "/config/")
+        app_dir = os.getenv("EMBYLISTS_APP_DIR", "/app/")
+        log_dir = log_dir or os.getenv("EMBYLISTS_LOG_DIR", "/var/log/")
+
+        self.list_type = list_type
+        self.section = list_type.section
+        self.prefix = list_type.prefix
+
+        self.config_file = "embylists.ini"
+        self.exampleconfigfile = "embylists.ini.example"
+        self.log_file = f"{list_type.script}.log"
+        self.state_file = f"{list_type.script}.state"
+        self.settings_file = f"{list_type.script}.settings"
+        self.deliveries_file = f"{list_type.script}.deliveries"
+        self.cooldown_file = f"{list_type.script}.cooldown"
+
+        # use pathlib for paths
+        self.config_filePath = Path(config_dir) / self.config_file
+        self.log_filePath = Path(log_dir) / self.log_file
+        self.state_filePath = Path(config_dir) / self.state_file
+        self.settings_filePath = Path(config_dir) / self.settings_file
+        self.deliveries_filePath = (
+            Path(config_dir) / self.deliveries_file
+        )
+        self.cooldown_filePath = Path(config_dir) / self.cooldown_file
+        self.snapshot_dir = (
+            Path(config_dir) / "snapshots" / list_type.script
+        )
+
+        # ensure config exists
+        try:
+            if not self.config_filePath.exists():
+                logging.error(
+                    f"Can't open file {self.config_filePath}, "
+                    "creating example INI file."
+                )
+                src = Path(app_dir) / self.exampleconfigfile
+                dst = Path(config_dir) / self.exampleconfigfile
+                # ensure destination directory exists
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(str(src), str(dst))
+                sys.exit(1)
+
+            try:
+                self.loadConfig(config_dir)
+
+            except (KeyError, ValueError) as e:
+                logging.error(
+                    f"Invalid INI contents or type error: {e}. "
+                    "Exiting."
+                )
+                sys.exit(1)
+
+        except (IOError, FileNotFoundError) as e:
+            logging.error(f"I/O error while checking config: {e}")
+            sys.exit(1)
+
+        # the log file stays open and is flushed at the end of every run
+        self.log = LogWriter(
+            self.log_filePath, self.log_format == 'JSON',
+            self.log_max_size * 1024 * 1024, self.log_max_age * 3600,
+            self.log_backups
+        )
+
+        # timings and counters of every run
+        self.metrics = Metrics(
+            list_type.script, self.metrics_textfile, self.nodename)
+
+        # who may ask for which list, looked up once per request
+        self.senders = SenderIndex(
+            tierRules(self.tiers),
+            Path(config_dir) / self.allowlist_file
+            if self.allowlist_file else None,
+            tuple(self.tiers)
+        )
+
+        # the subjects this list type answers, resolved with one lookup
+        self.dispatcher = Dispatcher()
+        self.registerCommands(self.dispatcher)
+
+        # title index of every list, for search requests
+        self.search_index = SearchIndex()
+
+        # encoded replies, reused until the lists change on disk
+        self.payloads = PayloadCache()
+
+        # which list version every recipient got, for DELIVERY = DELTA
+        self.deltas = DeltaDelivery(
+            self.deliveries_filePath, self.snapshot_dir
+        )
+
+        # when every sender last got the list, for COOLDOWN
+        self.cooldown = Cooldown(
+            self.cooldown_filePath, self.cooldown_minutes * 60
+        )
+
+        # SMTP sessions for the replies, one per worker, opened when needed
+        self.smtp = SMTPPool(
+            self.mail_server, self.mail_port,
+            self.mail_login, self.mail_password,
+            self.smtp_idle_timeout, self.workers
+        )
+
+        # notifications of a run go out as one push, in the background
+        self.pushover = PushoverQueue(
+            self.pushover_token_api, self.pushover_user_key,
+            self.pushover_sound, metrics=self.metrics
+        )
+
+    def loadConfig(self, config_dir):
+        """Set the settings of this list type from embylists.ini.
+
+        The validated settings are stored in a snapshot, later runs use
+        it instead of parsing the INI until the INI, this module or one
+        of the modules in SETTINGS_MODULES changes.
+        """
+        key = snapshotKey([self.config_filePath, Path(__file__)])
+        settings = loadSnapshot(self.settings_filePath, key)
+        if settings is None:
+            settings = self.readConfig(config_dir)
+            saveSnapshot(self.settings_filePath, key, settings)
+
+        vars(self).update(settings)
+        self.tiers = restoreTiers(settings['tiers'])
+
+    def readConfig(self, config_dir):
+        """Parse and validate embylists.ini, return the settings it set."""
+        import configparser
+
+        before = set(vars(self))
+
+        config = configparser.ConfigParser()
+        config.read(self.config_filePath)
+
+        # GENERAL
+        self.enabled = config.getboolean(
+            'GENERAL', 'ENABLED', fallback=False
+        )
+        self.dry_run = config.getboolean(
+            'GENERAL', 'DRY_RUN', fallback=False
+        )
+        self.verbose_logging = config.getboolean(
+            'GENERAL', 'VERBOSE_LOGGING', fallback=False
+        )
+        self.workers = config.getint(
+            'GENERAL', 'WORKERS', fallback=4
+        )
+        if self.workers < 1:
+            raise ValueError("WORKERS must be at least 1")
+
+        # NODE
+        self.nodename = config.get(
+            'NODE', 'NODE_NAME', fallback=''
+        )
+
+        # MAIL
+        self.mail_port = config.getint(
+            'MAIL', 'MAIL_PORT', fallback=0
+        )
+        self.mail_server = config.get(
+            'MAIL', 'MAIL_SERVER', fallback=''
+        )
+        self.mail_imap_port = config.getint(
+            'MAIL', 'MAIL_IMAP_PORT', fallback=imaplib.IMAP4_SSL_PORT
+        )
+        self.mail_login = config.get(
+            'MAIL', 'MAIL_LOGIN', fallback=''
+        )
+        self.mail_password = config.get(
+            'MAIL', 'MAIL_PASSWORD', fallback=''
+        )
+        self.mail_sender = config.get(
+            'MAIL', 'MAIL_SENDER', fallback=''
+        )
+        self.server_search = config.getboolean(
+            'MAIL', 'SERVER_SEARCH', fallback=True
+        )
+        self.search_senders = config.getboolean(
+            'MAIL', 'SEARCH_SENDERS', fallback=False
+        )
+        self.fetch_batch_size = config.getint(
+            'MAIL', 'FETCH_BATCH_SIZE', fallback=500
+        )
+        self.smtp_idle_timeout = config.getint(
+            'MAIL', 'SMTP_IDLE_TIMEOUT', fallback=60
+        )
+        self.archive_folder = config.get(
+            'MAIL', 'ARCHIVE_FOLDER', fallback=''
+        )
+        self.stream_threshold = config.getint(
+            'MAIL', 'STREAM_THRESHOLD', fallback=5
+        )
+
+        # MOVIES, SERIES, ...
+        # KEYWORD may hold several aliases, comma separated
+        self.keywords = parseKeywords(config.get(
+            self.section, 'KEYWORD', fallback=''
+        ))
+        # "<SEARCH_KEYWORD> <term>" only sends the matching titles
+        self.search_keywords = parseKeywords(config.get(
+            self.section, 'SEARCH_KEYWORD', fallback=''
+        ))
+        # the regular and DV lists plus any [<section>:<NAME>] tiers
+        self.tiers = loadTiers(
+            config, self.section, config_dir,
+            self.list_type.regular, self.list_type.dv,
+            self.list_type.subject
+        )
+        self.allowlist_file = config.get(
+            self.section, 'ALLOWED_SENDERS_FILE', fallback=''
+        )
+        self.delivery = config.get(
+            self.section, 'DELIVERY', fallback='FULL'
+        ).upper()
+        if self.delivery not in DELIVERY_MODES:
+            raise ValueError(
+                f"DELIVERY must be one of {DELIVERY_MODES}"
+            )
+        # a short reply when the sender has the current list
+        self.unchanged_reply = config.getboolean(
+            self.section, 'UNCHANGED_REPLY', fallback=False
+        )
+        # minutes before a sender can get the list again
+        self.cooldown_minutes = config.getint(
+            self.section, 'COOLDOWN', fallback=0
+        )
+        self.cooldown_reply = config.getboolean(
+            self.section, 'COOLDOWN_REPLY', fallback=False
+        )
+
+        # PUSHOVER
+        self.pushover_user_key = config.get(
+            'PUSHOVER', 'USER_KEY', fallback=''
+        )
+        self.pushover_token_api = config.get(
+            'PUSHOVER', 'TOKEN_API', fallback=''
+        )
+        self.pushover_sound = config.get(
+            'PUSHOVER', 'SOUND', fallback='pushover'
+        )
+
+        # METRICS
+        self.metrics_textfile = config.get(
+            'METRICS', 'TEXTFILE', fallback=''
+        )
+        self.metrics_summary = config.getboolean(
+            'METRICS', 'SUMMARY', fallback=True
+        )
+        self.metrics_port = config.getint(
+            'METRICS', f'{self.section}_PORT', fallback=0
+        )
+
+        # LOG
+        self.log_format = config.get(
+            'LOG', 'FORMAT', fallback='TEXT'
+        ).upper()
+        if self.log_format not in LOG_FORMATS:
+            raise ValueError(
+                f"FORMAT must be one of {LOG_FORMATS}"
+            )
+        self.log_max_size = config.getint(
+            'LOG', 'MAX_SIZE', fallback=10
+        )
+        self.log_max_age = config.getint(
+            'LOG', 'MAX_AGE', fallback=0
+        )
+        self.log_backups = config.getint(
+            'LOG', 'BACKUPS', fallback=5
+        )
+
+        settings = {
+            name: value for name, value in vars(self).items()
+            if name not in before
+        }
+        settings['tiers'] = dumpTiers(self.tiers)
+
+        return settings
+
+    def writeLog(self, init, msg, **fields):
+        self.log.write(msg, init, **fields)
+
+    def setup(self):
+        if self.dry_run:
+            logging.info(
+                "*****************************************")
+            logging.info(
+                "**** DRY RUN, NOTHING WILL SET AWAKE ****")
+            logging.info(
+                "*****************************************")
+
+            self.writeLog(
+                False,
+                f"{self.prefix} - Dry run.\n",
+                action='dry_run'
+            )
+
+    def connect(self):
+        with self.metrics.span('login'):
+            # create an IMAP4 class with SSL
+            imap = imaplib.IMAP4_SSL(
+                self.mail_server, self.mail_imap_port)
+            # authenticate
+            imap.login(self.mail_login, self.mail_password)
+
+        return imap
+
+    def run(self):
+        self.setup()
+
+        imap = self.connect()
+        self.process(imap)
+
+        # close the connections and logout
+        self.smtp.close()
+        imap.close()
+        imap.logout()
+        self.pushover.close()
+        self.report()
+        self.log.close()
+
+    def daemon(self):
+        self.setup()
+
+        if self.metrics_port:
+            self.metrics.serve(self.metrics_port)
+
+        logging.info(f"{self.prefix} - Waiting for new mail (IDLE).")
+        try:
+            watchMailbox(self.connect, self.cycle)
+        finally:
+            self.pushover.close()
+            self.log.close()
+
+    def cycle(self, imap):
+        self.process(imap)
+        self.report()
+
+    def report(self):
+        summary = self.metrics.finish()
+
+        if self.metrics_summary:
+            logging.info(f"{self.prefix} - Run summary {json.dumps(summary)}")
+            self.writeLog(
+                False, f"{self.prefix} - Run summary {json.dumps(summary)}\n",
+                action='summary', **summary
+            )
+            self.log.flush()
+
+    def process(self, imap):
+        processMailbox(self, imap, [self], self.prefix)
+
+    def registerCommands(self, dispatcher):
+        for keyword in self.keywords:
+            dispatcher.add(keyword, self, LIST)
+        for keyword in self.search_keywords:
+            dispatcher.add(keyword, self, SEARCH, prefix=True)
+
+    def handleMessage(self, sender, command=LIST, argument=''):
+        """Return the job that replies to a matching message.
+
+        Returns None when nothing has to be sent, the message can be
+        deleted right away then.
+        """
+        if self.verbose_logging:
+            logging.info(
+                f"{self.prefix} - Found matching subject from "
+                f"{sender}"
+            )
+        self.writeLog(
+            False, f"{self.prefix} - Found matching subject from "
+            f"{sender}\n",
+            action='request', sender=sender)
+
+        tier = self.tiers.get(self.senders.lookup(sender))
+        if tier is None:
+            if self.verbose_logging:
+                logging.info(
+                    f"{self.prefix} - sender not in"
+                    f" list {sender}."
+                    )
+            self.writeLog(
+                False,
+                f"{self.prefix} - sender not in list "
+                f"{sender}.\n",
+                action='refused', sender=sender
+            )
+            self.metrics.count('rejected')
+
+            return None
+
+        if not self.enabled:
+            if self.verbose_logging:
+                logging.info(
+                    f"{self.prefix} - Service is disabled by "
+                    f"{sender}"
+                )
+            self.writeLog(
+                False,
+                f"{self.prefix} - Service is disabled by "
+                f"{sender}\n",
+                action='disabled', sender=sender
+            )
+
+        if self.enabled and command == LIST:
+            sent_at = self.cooldown.lastSent(sender)
+            if sent_at is not None:
+                if self.verbose_logging:
+                    logging.info(
+                        f"{self.prefix} - List was sent recently to "
+                        f"{sender}"
+                    )
+                self.writeLog(
+                    False,
+                    f"{self.prefix} - List was sent recently to "
+                    f"{sender}\n",
+                    action='throttled', sender=sender
+                )
+                self.metrics.count('throttled')
+
+                if self.cooldown_reply:
+                    return partial(
+                        self.deliver, sender, tier, sent_at=sent_at)
+                return None
+
+        if command == SEARCH:
+            return partial(self.deliver, sender, tier, argument)
+
+        return partial(self.deliver, sender, tier)
+
+    def deliver(self, receiver_email, tier, search=None, sent_at=None):
+        import smtplib
+
+        started = time.monotonic()
+        sender_email = self.mail_sender
+
+        with self.metrics.span('build'):
+            payload = None
+            if self.enabled and sent_at is not None:
+                payload = self.buildCooldownPayload(tier, sent_at)
+            elif self.enabled and search is not None:
+                payload = self.buildSearchPayload(tier, search)
+            elif self.enabled and (
+                    self.delivery == 'DELTA' or self.unchanged_reply):
+                payload = self.buildCurrentPayload(receiver_email, tier)
+                if payload is None and self.delivery == 'DELTA':
+                    payload = self.buildDeltaPayload(receiver_email, tier)
+
+            if payload is None:
+                # the encoded reply only changes when the lists change on disk
+                payload = self.payloads.get(
+                    (self.enabled, tier.name), tier.paths(),
+                    lambda: self.buildPayload(tier)
+                )
+
+        if payload is None:
+            # the lists can't be read, the next run won't do better
+            raise UndeliverableError(
+                f"no reply could be built for {receiver_email}")
+
+        if self.enabled:
+            logging.info(
+                f"{self.prefix} - Sending {self.list_type.noun} list to"
+                f" {receiver_email}"
+                )
+            self.writeLog(
+                False,
+                f"{self.prefix} - Sending {self.list_type.noun} list to"
+                f" {receiver_email}\n",
+                action='sending', receiver=receiver_email
+            )
+
+        if isinstance(payload, str):
+            my_message = stampTo(payload, receiver_email)
+        else:
+            my_message = payload.addressedTo(receiver_email)
+
+        try:
+            with self.metrics.span('smtp'):
+                self.smtp.sendmail(
+                    sender_email,
+                    [receiver_email],
+                    my_message
+                    )
+            self.metrics.count('sent')
+            self.metrics.count(
+                'bytes_sent',
+                len(my_message) if isinstance(my_message, str)
+                else my_message.size
+            )
+
+            if self.verbose_logging:
+                logging.info(
+                    f"{self.prefix} - Mail Sent to "
+                    f"{receiver_email}."
+                )
+
+            self.writeLog(
+                False,
+                f"{self.prefix} - Mail Sent to "
+                f"{receiver_email}.\n",
+                action='sent', receiver=receiver_email,
+                seconds=round(time.monotonic() - started, 3)
+            )
+
+            if search is not None:
+                self.pushover.add(
+                    f"{self.prefix} - {self.list_type.title} search",
+                    receiver_email)
+            elif sent_at is None:
+                if self.enabled:
+                    self.cooldown.record(receiver_email)
+                if self.enabled and (
+                        self.delivery == 'DELTA' or self.unchanged_reply):
+                    self.deltas.record(receiver_email, tier.list_filePath)
+                self.pushover.add(
+                    f"{self.prefix} - {self.list_type.title} list",
+                    receiver_email)
+
+        except (gaierror, ConnectionRefusedError) as e:
+            logging.error(
+                "Failed to connect to the server. "
+                "Bad connection settings?")
+            raise UnavailableError(str(e)) from e
+        except smtplib.SMTPServerDisconnected as e:
+            logging.error(
+                "Failed to connect to the server. "
+                "Wrong user/password?"
+            )
+            raise UnavailableError(str(e)) from e
+        except smtplib.SMTPException as e:
+            logging.error(
+                f"SMTP error occurred: {str(e)}.")
+            if permanentError(e):
+                raise UndeliverableError(str(e)) from e
+            if not messageError(e):
+                # login or sender refused, not this reply's fault
+                raise UnavailableError(str(e)) from e
+            return False
+
+        return True
+
+    def markDeleted(self, uid):
+        if self.verbose_logging:
+            logging.info(
+                f"{self.prefix} - Marking message for delete.")
+        self.writeLog(
+            False, f"{self.prefix} - Marking message for delete.\n",
+            action='delete', uid=int(uid)
+            )
+
+        # the caller removes the marked messages together, at the end
+        return not self.dry_run
+
+    def buildPayload(self, tier):
+        # imported here, a run without replies doesn't need them
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+        from email.mime.application import MIMEApplication
+        from embylistsstream import filesSize
+
+        if self.enabled and self.delivery not in ('GZIP', 'ZIP') and \
+                filesSize(tier.paths()) >= self.stream_threshold * 1024 * 1024:
+            return self.buildStreamingPayload(tier)
+
+        message = MIMEMultipart()
+        message["From"] = self.mail_sender
+        message['Subject'] = tier.subject.format(node=self.nodename)
+
+        try:
+            if self.enabled and self.delivery in ('GZIP', 'ZIP'):
+                for obj in compressedParts(tier.paths(), self.delivery):
+                    message.attach(obj)
+                if tier.attachments:
+                    body = (
+                        "In de bijlage de lijst en de alfabetische "
+                        "lijst, gecomprimeerd.\n\n"
+                    )
+                else:
+                    body = "In de bijlage de lijst, gecomprimeerd.\n\n"
+
+            else:
+                for attachment_filePath in tier.attachments:
+                    obj = MIMEApplication(
+                        attachment_filePath.read_bytes())
+                    obj.add_header(
+                        'Content-Disposition', 'attachment',
+                        filename=attachment_filePath.name
+                    )
+                    message.attach(obj)
+
+                if self.enabled:
+                    with open(
+                            tier.list_filePath, 'r') as file:
+                        body = ""
+                        if tier.attachments:
+                            body = (
+                                "In de bijlage ook de "
+                                "alfabetische lijst.\n\n"
+                            )
+                        body += file.read()
+
+                else:
+                    body = (
+                        f"Hi,\n\nDe service voor {self.nodename} "
+                        f"staat uit, je hoeft even geen "
+                        f"commando's te sturen.\n\n"
+                        f"Fijne dag!\n\n"
+                    )
+
+        except FileNotFoundError as e:
+            logging.error(
+                f"Can't find file "
+                f"{e.filename}."
+            )
+            return None
+        except IOError as e:
+            logging.error(
+                f"Can't read file "
+                f"{e.filename}."
+            )
+            return None
+
+        # logfile = open(self.log_filePath, "r")
+        # body += ''.join(logfile.readlines())
+        # logfile.close()
+
+        plain_text = MIMEText(
+            body, _subtype='plain', _charset='UTF-8')
+        message.attach(plain_text)
+
+        # the To header is stamped per reply by stampTo()
+        return message.as_string()
+
+    def buildStreamingPayload(self, tier):
+        from embylistsstream import StreamingPayload, attachmentPart, textPart
+
+        # large lists are read from disk for every reply instead of being
+        # kept in memory, encoded, for the whole run
+        for path in tier.paths():
+            if not path.is_file():
+                logging.error(
+                    f"Can't find file "
+                    f"{path}."
+                )
+                return None
+
+        payload = StreamingPayload(
+            self.mail_sender, tier.subject.format(node=self.nodename))
+
+        for attachment_filePath in tier.attachments:
+            payload.attach(
+                attachmentPart(attachment_filePath.name), attachment_filePath)
+
+        body = ""
+        if tier.attachments:
+            body = "In de bijlage ook de alfabetische lijst.\n\n"
+        payload.attach(textPart(), body.encode('utf-8'), tier.list_filePath)
+
+        return payload
+
+    def buildTextPayload(self, tier, body):
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+
+        message = MIMEMultipart()
+        message["From"] = self.mail_sender
+        message['Subject'] = tier.subject.format(node=self.nodename)
+
+        plain_text = MIMEText(body, _subtype='plain', _charset='UTF-8')
+        message.attach(plain_text)
+
+        return message.as_string()
+
+    def buildCurrentPayload(self, receiver, tier):
+        current = self.deltas.current(receiver, tier.list_filePath)
+        if current is None:
+            return None
+
+        return self.buildTextPayload(tier, currentBody(*current))
+
+    def buildDeltaPayload(self, receiver, tier):
+        changes = self.deltas.changes(receiver, tier.list_filePath)
+        if changes is None:
+            # first request, send the full list
+            return None
+
+        return self.buildTextPayload(tier, deltaBody(*changes))
+
+    def buildSearchPayload(self, tier, term):
+        try:
+            lines = self.search_index.search(tier.list_filePath, term)
+        except IOError as e:
+            logging.error(
+                f"Can't read file "
+                f"{e.filename}."
+            )
+            return None
+
+        return self.buildTextPayload(tier, searchBody(term, lines))
+
+    def buildCooldownPayload(self, tier, sent_at):
+        return self.buildTextPayload(
+            tier, cooldownBody(sent_at, self.cooldown.seconds))
@@ -0,0 +1,401 @@
+# Name: embylistsimap
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""IMAP helpers shared by the emby_lists mail scripts."""
+
+import email
+import imaplib
+import logging
+import re
+import socket
+import time
+
+from contextlib import nullcontext
+
+# RFC 2177: clients should re-issue IDLE at least every 29 minutes
+IDLE_TIMEOUT = 29 * 60
+# how often servers without IDLE are polled, in seconds
+POLL_INTERVAL = 60
+# upper bound for the reconnect backoff, in seconds
+MAX_BACKOFF = 300
+
+HEADER_FIELDS = "BODY.PEEK[HEADER.FIELDS (SUBJECT FROM)]"
+UID_RE = re.compile(rb'UID (\d+)')
+
+
+def quoteString(value):
+    """Return value as an IMAP quoted string."""
+    value = value.replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{value}"'
+
+
+def buildFromCriteria(senders):
+    """Return the SEARCH criteria matching any of the given senders.
+
+    IMAP only knows a binary OR, so three senders become
+    ``OR FROM a OR FROM b FROM c``.
+    """
+    senders = [s for s in senders if s]
+    if not senders:
+        return []
+
+    criteria = ['FROM', quoteString(senders[-1])]
+    for sender in reversed(senders[:-1]):
+        criteria = ['OR', 'FROM', quoteString(sender)] + criteria
+
+    return criteria
+
+
+def selectedUids(imap):
+    """Return (UIDVALIDITY, UIDNEXT) reported by the last SELECT.
+
+    Either value is None when the server did not report it.
+    """
+    values = []
+
+    for code in ('UIDVALIDITY', 'UIDNEXT'):
+        typ, data = imap.response(code)
+        try:
+            values.append(int(data[-1]))
+        except (TypeError, ValueError, IndexError):
+            values.append(None)
+
+    return tuple(values)
+
+
+def uidRange(min_uid):
+    """Return the SEARCH criteria for UIDs from min_uid onwards."""
+    if min_uid and min_uid > 1:
+        return ['UID', f"{min_uid}:*"]
+    return []
+
+
+def newUids(data, min_uid):
+    """Return the UIDs in a SEARCH response that are at least min_uid.
+
+    ``n:*`` always includes the highest UID, even when it is below n, so
+    the range is checked again here.
+    """
+    if not data or not data[0]:
+        return []
+
+    return [uid for uid in data[0].split() if int(uid) >= (min_uid or 1)]
+
+
+def subjectCriteria(keywords):
+    """Return the SEARCH criteria matching any of the ascii keywords."""
+    criteria = ['SUBJECT', quoteString(keywords[-1])]
+    for keyword in reversed(keywords[:-1]):
+        criteria = ['OR', 'SUBJECT', quoteString(keyword)] + criteria
+
+    return criteria
+
+
+def searchCandidates(imap, keywords, senders=None, min_uid=None):
+    """Ask the server for the UIDs of messages that may match keywords.
+
+    keywords is one keyword or a list of them. SUBJECT is a
+    case-insensitive substring search on the server, so the caller still
+    has to verify the subject of each returned message. When senders is
+    given, only messages from those senders are returned, when min_uid is
+    given only messages with at least that UID.
+    """
+    if isinstance(keywords, str):
+        keywords = [keywords]
+    keywords = list(dict.fromkeys(keywords))
+    criteria = uidRange(min_uid) + buildFromCriteria(senders or [])
+
+    if not keywords:
+        return []
+
+    try:
+        for keyword in keywords:
+            keyword.encode('ascii')
+    except UnicodeEncodeError:
+        # non-ascii keywords go as a literal, which imaplib always sends
+        # as the last argument of the command, so one search per keyword
+        uids = set()
+        for keyword in keywords:
+            imap.literal = keyword.encode('utf-8')
+            status, data = imap.uid(
+                'SEARCH', 'CHARSET', 'UTF-8', *criteria, 'SUBJECT')
+            if status == 'OK':
+                uids.update(newUids(data, min_uid))
+        return sorted(uids, key=int)
+
+    status, data = imap.uid(
+        'SEARCH', *criteria, *subjectCriteria(keywords))
+
+    if status != 'OK':
+        return []
+
+    return newUids(data, min_uid)
+
+
+def searchAll(imap, min_uid=None):
+    """Return the UIDs of all (or from min_uid on) selected messages."""
+    status, data = imap.uid('SEARCH', *(uidRange(min_uid) or ['ALL']))
+
+    if status != 'OK':
+        return []
+
+    return newUids(data, min_uid)
+
+
+def compressUids(uids):
+    """Return uids as a compact IMAP sequence set, e.g. ``1:5,7,9:10``."""
+    numbers = sorted({int(uid) for uid in uids})
+    ranges = []
+
+    for number in numbers:
+        if ranges and number == ranges[-1][1] + 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+
+    return ','.join(
+        str(first) if first == last else f"{first}:{last}"
+        for first, last in ranges
+    )
+
+
+def copyMessages(imap, command, uid_set, mailbox):
+    """UID COPY or MOVE uid_set to mailbox, creating it when needed."""
+    status, data = imap.uid(command, uid_set, quoteString(mailbox))
+
+    if status != 'OK' and b'TRYCREATE' in b' '.join(data or []):
+        imap.create(quoteString(mailbox))
+        status, data = imap.uid(command, uid_set, quoteString(mailbox))
+
+    return status == 'OK'
+
+
+def removeMessages(imap, uids, archive=None):
+    """Remove the messages with the given uids from the selected mailbox.
+
+    All of them are flagged as deleted with one UID STORE over a
+    compressed UID set, then expunged. When archive is given they are
+    moved to that mailbox instead, with UID MOVE when the server has it
+    and UID COPY otherwise. Returns False when they could not be
+    archived or flagged, they are then left alone.
+    """
+    if not uids:
+        return True
+
+    uid_set = compressUids(uids)
+
+    if archive:
+        if 'MOVE' in imap.capabilities:
+            try:
+                # RFC 6851, copies and expunges in one command
+                if copyMessages(imap, 'MOVE', uid_set, archive):
+                    return True
+            except imaplib.IMAP4.error as e:
+                logging.info(f"UID MOVE failed ({e}), copying instead.")
+
+        if not copyMessages(imap, 'COPY', uid_set, archive):
+            logging.error(f"Can't copy messages to {archive}.")
+            return False
+
+    status, data = imap.uid('STORE', uid_set, '+FLAGS.SILENT', '(\\Deleted)')
+    if status != 'OK':
+        logging.error(f"Can't flag messages as deleted: {data}")
+        return False
+
+    imap.expunge()
+
+    return True
+
+
+def parseFetch(data):
+    """Yield (uid, payload) pairs from an imaplib FETCH response.
+
+    Servers may put the UID before or after the literal, so the trailing
+    part of each response is checked as well.
+    """
+    uid = payload = None
+
+    for response in data:
+        if isinstance(response, tuple):
+            if payload is not None:
+                yield uid, payload
+            match = UID_RE.search(response[0])
+            uid = match.group(1) if match else None
+            payload = response[1]
+        elif payload is not None:
+            if uid is None and response:
+                match = UID_RE.search(response)
+                uid = match.group(1) if match else None
+            yield uid, payload
+            uid = payload = None
+
+    if payload is not None:
+        yield uid, payload
+
+
+def fetchHeaders(imap, uids, batch_size=500, metrics=None):
+    """Fetch the Subject and From headers of uids in batches.
+
+    Every batch of batch_size UIDs costs one round trip. Yields
+    (uid, message) where message only holds those headers, so the caller
+    can start matching before the next batch is requested. The messages
+    are not marked as seen. The round trips and the fetched bytes are
+    added to metrics when given.
+    """
+    uids = list(uids)
+    batch_size = max(1, batch_size)
+
+    for start in range(0, len(uids), batch_size):
+        with metrics.span('fetch') if metrics else nullcontext():
+            status, data = imap.uid(
+                "FETCH",
+                compressUids(uids[start:start + batch_size]),
+                f"(UID {HEADER_FIELDS})"
+            )
+
+        if status != 'OK':
+            continue
+
+        for uid, payload in parseFetch(data):
+            if metrics:
+                metrics.count('bytes_fetched', len(payload))
+            if uid is not None:
+                yield uid, email.message_from_bytes(payload)
+
+
+def decodePart(value, encoding):
+    """Return the str of a decoded header part.
+
+    An unknown charset is read as utf-8 and undecodable bytes are
+    replaced, so one odd message can't stop the scan.
+    """
+    if not isinstance(value, bytes):
+        return value
+
+    try:
+        return value.decode(encoding or "utf-8", errors="replace")
+    except (LookupError, UnicodeDecodeError):
+        return value.decode("utf-8", errors="replace")
+
+
+def decodeHeaders(msg):
+    """Return the decoded subject and sender address of msg."""
+    from email.header import decode_header
+
+    # decode the email subject
+    subject = decodePart(*decode_header(msg["Subject"] or "")[0])
+
+    # decode email sender
+    From = decodePart(*decode_header(msg.get("From") or "")[-1:][0])
+
+    match = re.search(r'[\w.+-]+@[\w-]+\.[\w.-]+', From)
+
+    return subject, match.group(0) if match else From
+
+
+def fetchMessage(imap, uid):
+    """Fetch and parse the full message with the given uid."""
+    status, data = imap.uid("FETCH", uid, "(RFC822)")
+
+    if status != 'OK':
+        return None
+
+    for _, payload in parseFetch(data):
+        return email.message_from_bytes(payload)
+
+    return None
+
+
+def waitForMail(imap, timeout=IDLE_TIMEOUT):
+    """Block in IDLE until the server reports new mail or timeout passes.
+
+    Returns True when the mailbox changed. Servers without IDLE support
+    are polled instead. Raises imaplib.IMAP4.abort when the connection
+    breaks.
+    """
+    if 'IDLE' not in imap.capabilities:
+        time.sleep(min(timeout, POLL_INTERVAL))
+        return True
+
+    tag = imap._new_tag()
+    imap.tagged_commands.pop(tag, None)
+    imap.send(tag + b' IDLE\r\n')
+
+    line = imap.readline()
+    if not line.startswith(b'+'):
+        raise imap.abort(f"IDLE refused: {line!r}")
+
+    changed = False
+    deadline = time.monotonic() + timeout
+    try:
+        while not changed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            imap.sock.settimeout(remaining)
+            line = imap.readline()
+            if not line:
+                raise imap.abort("connection closed during IDLE")
+            # ignore keepalives like "* OK still here"
+            changed = b'EXISTS' in line or b'RECENT' in line
+    except socket.timeout:
+        # a timed out socket file can't be read from again
+        imap.file = imap.sock.makefile('rb')
+    finally:
+        imap.sock.settimeout(None)
+
+    imap.send(b'DONE\r\n')
+    while True:
+        line = imap.readline()
+        if not line:
+            raise imap.abort("connection closed after IDLE")
+        if line.startswith(tag):
+            break
+
+    return changed
+
+
+def watchMailbox(connect, process, timeout=IDLE_TIMEOUT):
+    """Keep one IMAP session open and call process(imap) on new mail.
+
+    connect() returns a logged in IMAP4 instance. Lost connections are
+    re-established with an exponential backoff. A cycle that fails for
+    another reason is logged and the watch goes on. Runs until
+    interrupted.
+    """
+    delay = 1
+
+    while True:
+        imap = None
+        try:
+            imap = connect()
+            delay = 1
+            while True:
+                try:
+                    process(imap)
+                except (imaplib.IMAP4.error, OSError):
+                    raise
+                except Exception:
+                    logging.exception(
+                        "Processing the mailbox failed, "
+                        "waiting for new mail.")
+                while not waitForMail(imap, timeout):
+                    pass
+        except (imaplib.IMAP4.error, OSError) as e:
+            logging.error(
+                f"IMAP connection lost: {e}. Reconnecting in {delay}s."
+            )
+        except Exception:
+            logging.exception(
+                f"IMAP watch failed. Reconnecting in {delay}s.")
+        finally:
+            if imap is not None:
+                try:
+                    imap.logout()
+                except (imaplib.IMAP4.error, OSError):
+                    pass
+
+        time.sleep(delay)
+        delay = min(delay * 2, MAX_BACKOFF)
@@ -0,0 +1,145 @@
+# Name: embylistslog
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""Buffered log file with rotation and optional JSON lines output."""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+from datetime import datetime
+
+# valid values for FORMAT in the LOG section
+LOG_FORMATS = ('TEXT', 'JSON')
+
+# the time a TEXT or JSON log line starts with
+LINE_TIME_RE = re.compile(
+    r'^(?:\{"time": ")?(\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d(?:\.\d+)?)')
+
+
+class LogWriter():
+    """Keeps the log file open and writes it in large chunks.
+
+    The file is rotated to <name>.1 .. <name>.<backups> when it grows
+    past max_bytes or has been written for longer than max_age seconds
+    (0 disables either check). Lines reach the disk on flush(), which
+    the scripts call at the end of every run.
+    """
+
+    def __init__(
+            self, path, json_lines=False,
+            max_bytes=0, max_age=0, backups=5):
+        self.path = Path(path)
+        self.json_lines = json_lines
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backups = backups
+
+        self.file = None
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def write(self, msg, truncate=False, **fields):
+        """Add msg to the log, fields only end up in JSON lines output."""
+        now = datetime.now()
+
+        if self.json_lines:
+            line = json.dumps(
+                {'time': now.isoformat(), 'message': msg.strip(), **fields},
+                ensure_ascii=False, default=str
+            ) + "\n"
+        else:
+            line = f"{now} - {msg}"
+
+        with self.lock:
+            try:
+                if truncate:
+                    self.release()
+                    self.open("w")
+                else:
+                    if self.file is None:
+                        self.open("a")
+                    if self.due():
+                        self.rotate()
+                self.file.write(line)
+            except (IOError, OSError):
+                logging.error(f"Can't write file {self.path}.")
+                self.drop()
+
+    def open(self, mode):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(
+            self.path, mode, encoding='utf-8', buffering=64 * 1024)
+        # a run of the scripts is a process of its own, so the age comes
+        # from the file, not from when this process opened it
+        self.opened = self.started()
+
+    def started(self):
+        """Return when the first line of the log file was written."""
+        try:
+            with open(
+                    self.path, 'r', encoding='utf-8',
+                    errors='replace') as logfile:
+                line = logfile.readline(256)
+            if not line:
+                return time.time()
+            match = LINE_TIME_RE.match(line)
+            if match:
+                return datetime.fromisoformat(match.group(1)).timestamp()
+            return os.stat(self.path).st_mtime
+        except (IOError, OSError, ValueError):
+            return time.time()
+
+    def due(self):
+        if self.max_bytes and self.file.tell() >= self.max_bytes:
+            return True
+        return bool(self.max_age) and \
+            time.time() - self.opened >= self.max_age
+
+    def rotate(self):
+        self.release()
+        if self.backups > 0:
+            for number in range(self.backups - 1, 0, -1):
+                older = self.path.with_name(f"{self.path.name}.{number}")
+                if older.exists():
+                    os.replace(
+                        older,
+                        self.path.with_name(f"{self.path.name}.{number + 1}")
+                    )
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self.open("a")
+
+    def flush(self):
+        with self.lock:
+            if self.file is not None:
+                try:
+                    self.file.flush()
+                except (IOError, OSError):
+                    logging.error(f"Can't write file {self.path}.")
+                    self.drop()
+
+    def close(self):
+        with self.lock:
+            self.drop()
+
+    def release(self):
+        if self.file is not None:
+            try:
+                self.file.close()
+            finally:
+                self.file = None
+
+    def drop(self):
+        # forget a broken file, the next line tries to open it again
+        try:
+            self.release()
+        except (IOError, OSError):
+            self.file = None
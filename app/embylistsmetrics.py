@@ -0,0 +1,212 @@
+# Name: embylistsmetrics
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""Timings and counters of a run, for Prometheus and the log."""
+
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# counters every run reports, also when they stay 0
+COUNTERS = (
+    'scanned', 'matched', 'rejected', 'coalesced', 'throttled', 'sent',
+    'send_failures', 'undeliverable', 'deleted', 'bytes_fetched',
+    'bytes_sent',
+)
+
+# characters of a node name that don't go in a file name
+UNSAFE_RE = re.compile(r'[^\w.-]')
+
+
+def jobFile(path, job, node=''):
+    """Return path with job before its suffix, e.g. embylists.<job>.prom.
+
+    With a node the file is embylists.<job>.<node>.prom.
+    """
+    path = Path(path)
+    if node:
+        job = f"{job}.{UNSAFE_RE.sub('_', node)}"
+    return path.with_name(f"{path.stem}.{job}{path.suffix}")
+
+
+def labelValue(value):
+    """Return value escaped for a label in the Prometheus text format."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n')
+
+
+class Metrics():
+    """Collects the phase timings and counters of the current run.
+
+    start() marks the start of a run, finish() closes it: it adds the
+    run to the totals, writes the Prometheus textfile when one is
+    configured and returns the summary.
+    """
+
+    def __init__(self, job, textfile=None, node=''):
+        self.job = job
+        self.node = node
+        # the scripts and nodes share TEXTFILE, each writes its own file
+        self.textfile = jobFile(textfile, job, node) if textfile else None
+        self.lock = threading.Lock()
+
+        self.runs = 0
+        self.totals = dict.fromkeys(COUNTERS, 0)
+        self.seconds_total = {}
+        self.last = {}
+        self.finished = None
+        self.reset()
+
+    def reset(self):
+        self.started = time.monotonic()
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.seconds = {}
+
+    def start(self):
+        """Time the run from now on, not from the previous finish()."""
+        with self.lock:
+            self.started = time.monotonic()
+
+    @contextmanager
+    def span(self, phase):
+        """Add the time spent in the with block to phase."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self.lock:
+                self.seconds[phase] = self.seconds.get(phase, 0) + elapsed
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self):
+        with self.lock:
+            summary = {
+                'job': self.job,
+                'duration': round(time.monotonic() - self.started, 3),
+                'phases': {
+                    phase: round(seconds, 3)
+                    for phase, seconds in self.seconds.items()
+                },
+                **self.counters,
+            }
+
+            self.runs += 1
+            for name, value in self.counters.items():
+                self.totals[name] = self.totals.get(name, 0) + value
+            for phase, seconds in self.seconds.items():
+                self.seconds_total[phase] = \
+                    self.seconds_total.get(phase, 0) + seconds
+            self.last = summary
+            self.finished = time.time()
+            self.reset()
+
+        if self.textfile is not None:
+            self.writeTextfile()
+
+        return summary
+
+    def render(self):
+        """Return the metrics in the Prometheus text format."""
+        labels = f'job="{labelValue(self.job)}"'
+        if self.node:
+            labels += f',node="{labelValue(self.node)}"'
+        lines = []
+
+        with self.lock:
+            if not self.last:
+                return ""
+
+            lines += [
+                "# TYPE embylists_runs_total counter",
+                f"embylists_runs_total{{{labels}}} {self.runs}",
+                "# TYPE embylists_last_run_timestamp_seconds gauge",
+                f"embylists_last_run_timestamp_seconds{{{labels}}} "
+                f"{self.finished:.3f}",
+                "# TYPE embylists_last_run_duration_seconds gauge",
+                f"embylists_last_run_duration_seconds{{{labels}}} "
+                f"{self.last['duration']}",
+                "# TYPE embylists_last_run_phase_seconds gauge",
+            ]
+            lines += [
+                f"embylists_last_run_phase_seconds"
+                f'{{{labels},phase="{phase}"}} {seconds}'
+                for phase, seconds in self.last['phases'].items()
+            ]
+            lines.append("# TYPE embylists_phase_seconds_total counter")
+            lines += [
+                f'embylists_phase_seconds_total{{{labels},phase="{phase}"}} '
+                f"{seconds:.3f}"
+                for phase, seconds in self.seconds_total.items()
+            ]
+            for name, value in self.totals.items():
+                lines += [
+                    f"# TYPE embylists_last_run_{name} gauge",
+                    f"embylists_last_run_{name}{{{labels}}} {self.last[name]}",
+                    f"# TYPE embylists_{name}_total counter",
+                    f"embylists_{name}_total{{{labels}}} {value}",
+                ]
+
+        return "\n".join(lines) + "\n"
+
+    def writeTextfile(self):
+        # node_exporter may read the file at any time, replace it at once
+        try:
+            self.textfile.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(
+                dir=self.textfile.parent, prefix=self.textfile.name)
+            with os.fdopen(fd, 'w', encoding='utf-8') as promfile:
+                promfile.write(self.render())
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, self.textfile)
+        except OSError as e:
+            logging.error(f"Can't write file {self.textfile}: {e}")
+
+    def serve(self, port, address=''):
+        """Serve /metrics on port from a background thread.
+
+        Returns the server, or None when port can't be bound.
+        """
+        # imported here, a run without the endpoint doesn't need it
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header(
+                    'Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            server = ThreadingHTTPServer((address, port), MetricsHandler)
+        except OSError as e:
+            logging.error(f"Can't serve metrics on port {port}: {e}")
+            return None
+        server.daemon_threads = True
+        threading.Thread(
+            target=server.serve_forever, name="metrics", daemon=True
+        ).start()
+
+        return server
@@ -0,0 +1,176 @@
+# Name: embylistsnodes
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""Serve the lists of several Emby nodes from one process.
+
+Every node (account) is a config directory of its own, with its own
+embylists.ini ([NODE], [MAIL], ...), list files and state files, and
+is served like embylistsbymail.py serves a single one. An asyncio
+event loop schedules the accounts; their IMAP and SMTP work runs on a
+small shared thread pool, so dozens of nodes need one process and
+only have connections open while they are being polled.
+"""
+
+import argparse
+import asyncio
+import imaplib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from embylistsbymail import ELBE
+
+# seconds between two polls of an account in --daemon mode
+POLL_INTERVAL = 60
+# accounts that are polled at the same time
+CONCURRENCY = 4
+
+
+def findAccounts(config_dir):
+    """Return the subdirectories of config_dir holding an embylists.ini."""
+    return sorted(
+        path for path in Path(config_dir).iterdir()
+        if (path / "embylists.ini").is_file()
+    )
+
+
+class Account():
+    """One Emby node, with its own mailbox, lists and logs."""
+
+    def __init__(self, config_dir, log_dir):
+        self.name = Path(config_dir).name
+        self.service = ELBE(str(config_dir), str(Path(log_dir) / self.name))
+
+    def poll(self):
+        """Process new mail on a fresh IMAP session, then log out."""
+        imap = self.service.connect()
+        try:
+            self.service.cycle(imap)
+            imap.close()
+        finally:
+            try:
+                imap.logout()
+            except (imaplib.IMAP4.error, OSError):
+                pass
+
+    def close(self):
+        self.service.smtp.close()
+        self.service.pushover.close()
+        self.service.close()
+
+
+class Engine():
+    """Runs the accounts concurrently on one event loop."""
+
+    def __init__(self, accounts, interval=POLL_INTERVAL):
+        self.accounts = accounts
+        self.interval = interval
+
+    async def call(self, account, job):
+        # the log lines of an account carry its name as thread name
+        def named():
+            threading.current_thread().name = account.name
+            job()
+
+        try:
+            await asyncio.to_thread(named)
+        except (imaplib.IMAP4.error, OSError) as e:
+            logging.error(f"{account.name} - Run failed: {e}")
+        except Exception:
+            # a bug hit by one account must not stop the others
+            logging.exception(f"{account.name} - Run failed")
+
+    async def run(self):
+        """Serve every account once, all at the same time."""
+        await asyncio.gather(*(
+            self.call(account, account.service.run)
+            for account in self.accounts
+        ))
+
+    async def watch(self, account, delay):
+        await asyncio.sleep(delay)
+        account.service.setup()
+        # every account serves its own metrics, on the PORT of its INI
+        if account.service.metrics_port:
+            account.service.metrics.serve(account.service.metrics_port)
+
+        while True:
+            await self.call(account, account.poll)
+            await asyncio.sleep(self.interval)
+
+    async def daemon(self):
+        """Poll every account each interval, until cancelled."""
+        # spread the polls over the interval instead of all at once
+        step = self.interval / max(1, len(self.accounts))
+        try:
+            await asyncio.gather(*(
+                self.watch(account, number * step)
+                for number, account in enumerate(self.accounts)
+            ))
+        finally:
+            for account in self.accounts:
+                account.close()
+
+
+async def main(args):
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=max(1, args.concurrency)))
+
+    log_dir = os.getenv("EMBYLISTS_LOG_DIR", "/var/log/")
+    config_dirs = args.config_dirs or findAccounts(
+        os.getenv("EMBYLISTS_CONFIG_DIR", "/config/"))
+
+    accounts = []
+    for config_dir in config_dirs:
+        try:
+            accounts.append(Account(config_dir, log_dir))
+        except SystemExit:
+            # the account logged why its INI can't be used
+            logging.error(f"Skipping account {config_dir}.")
+
+    if not accounts:
+        logging.error("No accounts to serve. Exiting.")
+        return
+
+    logging.info(
+        f"EmbyLists - Serving {len(accounts)} accounts: "
+        f"{', '.join(account.name for account in accounts)}"
+    )
+
+    engine = Engine(accounts, args.interval)
+    if args.daemon:
+        await engine.daemon()
+    else:
+        await engine.run()
+
+
+if __name__ == '__main__':
+
+    logging.basicConfig(
+        format='%(asctime)s - %(threadName)s - %(levelname)s - %(message)s',
+        level=logging.INFO)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'config_dirs', nargs='*',
+        help="config directories of the accounts (default: every "
+             "subdirectory of EMBYLISTS_CONFIG_DIR with an embylists.ini)")
+    parser.add_argument(
+        '--daemon', action='store_true',
+        help="keep running and poll the accounts every --interval seconds")
+    parser.add_argument(
+        '--interval', type=int, default=POLL_INTERVAL,
+        help=f"seconds between two polls (default {POLL_INTERVAL})")
+    parser.add_argument(
+        '--concurrency', type=int, default=CONCURRENCY,
+        help=f"accounts polled at the same time (default {CONCURRENCY})")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        pass
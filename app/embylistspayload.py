@@ -0,0 +1,72 @@
+# Name: embylistspayload
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""Cache of encoded reply messages, rebuilt when the lists change."""
+
+import os
+import threading
+
+
+def fileKey(paths):
+    """Return what identifies the current version of the files in paths."""
+    key = []
+
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            key.append((str(path), None, None))
+        else:
+            key.append((str(path), stat.st_mtime_ns, stat.st_size))
+
+    return tuple(key)
+
+
+def stampTo(payload, receiver):
+    """Return the cached message payload addressed to receiver."""
+    from email.header import Header
+
+    return f"To: {Header(receiver).encode()}\n{payload}"
+
+
+class PayloadCache():
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+        # one lock per name, held while that payload is being built
+        self.building = {}
+
+    def get(self, name, paths, build):
+        """Return the payload called name, built by build().
+
+        The payload is only rebuilt when one of the files in paths has
+        changed on disk (mtime or size) since it was built. build() may
+        return None when the files can't be read, which is not cached.
+        Workers asking for the same payload meanwhile wait for that one
+        build instead of building it too.
+        """
+        key = fileKey(paths)
+
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is not None and entry[0] == key:
+                return entry[1]
+            building = self.building.setdefault(name, threading.Lock())
+
+        with building:
+            # it may have been built while this worker waited
+            with self.lock:
+                entry = self.entries.get(name)
+                if entry is not None and entry[0] == key:
+                    return entry[1]
+
+            payload = build()
+
+            if payload is not None:
+                with self.lock:
+                    self.entries[name] = (key, payload)
+
+        return payload
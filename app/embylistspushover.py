@@ -0,0 +1,117 @@
+# Name: embylistspushover
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""Pushover notifications, sent in the background once per run."""
+
+import logging
+import queue
+import threading
+import time
+
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+
+class PushoverQueue():
+    """Collects the notifications of a run and pushes them as one message.
+
+    The Pushover client is only created when there is something to send,
+    and sending happens on a background thread so replies never wait for
+    it. Leave the token or user key blank to disable notifications.
+    """
+
+    def __init__(
+            self, token_api, user_key, sound='pushover',
+            retries=3, retry_delay=5, metrics=None):
+        self.token_api = token_api
+        self.user_key = user_key
+        self.sound = sound
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.metrics = metrics
+
+        self.enabled = bool(token_api and user_key)
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.thread = None
+        self.app = None
+        self.user = None
+
+    def add(self, topic, recipient):
+        """Note that topic (e.g. "MoviesList - Movies list") went out."""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.pending.setdefault(topic, []).append(recipient)
+
+    def flush(self):
+        """Hand the notifications collected so far to the sender thread."""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return
+
+        lines = []
+        for topic, recipients in pending.items():
+            if len(recipients) == 1:
+                lines.append(f"{topic} sent to {recipients[0]}")
+            else:
+                lines.append(
+                    f"{topic} sent to {len(recipients)} recipients: "
+                    f"{', '.join(recipients)}"
+                )
+
+        self.start()
+        self.queue.put("\n".join(lines) + "\n")
+
+    def close(self, timeout=30):
+        """Flush and wait up to timeout seconds for the pushes to go out."""
+        self.flush()
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join(timeout)
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(
+                target=self.work, name="pushover", daemon=True)
+            self.thread.start()
+
+    def work(self):
+        while True:
+            message = self.queue.get()
+            if message is None:
+                return
+            with self.metrics.span('pushover') if self.metrics \
+                    else nullcontext():
+                self.send(message)
+
+    def send(self, message):
+        for attempt in range(self.retries):
+            try:
+                if self.user is None:
+                    # imported here, chump pulls in its whole HTTP stack
+                    from chump import Application
+                    self.app = Application(self.token_api)
+                    self.user = self.app.get_user(self.user_key)
+
+                if self.app.remaining == 0 and self.app.reset is not None \
+                        and self.app.reset > datetime.now(timezone.utc):
+                    logging.warning(
+                        f"Pushover message limit reached until "
+                        f"{self.app.reset}, notification dropped."
+                    )
+                    return
+
+                self.user.send_message(message=message, sound=self.sound)
+                return
+
+            except Exception as e:
+                logging.error(f"Pushover notification failed: {e}")
+                if attempt + 1 < self.retries:
+                    time.sleep(self.retry_delay * 2 ** attempt)
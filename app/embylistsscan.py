@@ -0,0 +1,174 @@
+# Name: embylistsscan
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""The mailbox scan shared by the emby_lists mail scripts.
+
+The standalone scripts scan with themselves as the only handler,
+embylistsbymail.py with one handler per configured list type.
+"""
+
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+
+from embylistsimap import (
+    decodeHeaders, fetchHeaders, removeMessages, searchAll, searchCandidates,
+    selectedUids
+)
+from embylistssmtp import finishDeliveries
+from embylistsstate import readState, writeState
+
+# runs in which a failing reply is tried before the scan gives up on it,
+# runs in which the mail server was unavailable don't count
+MAX_ATTEMPTS = 5
+
+
+def processMailbox(owner, imap, handlers, prefix):
+    """Answer the requests in the INBOX of imap.
+
+    owner is the script running the scan, it provides the settings, the
+    dispatcher, metrics, log and Pushover queue. handlers are the list
+    types whose commands owner.dispatcher resolves. prefix starts the
+    log lines, e.g. "MoviesList".
+    """
+    metrics = owner.metrics
+    # a daemon waited for this mail, that's not part of the run
+    metrics.start()
+
+    with metrics.span('select'):
+        status, messages = imap.select("INBOX")
+
+    # only look at mail that arrived after the previous run, unless
+    # the server renumbered the mailbox
+    uidvalidity, uidnext = selectedUids(imap)
+    watermark = readState(owner.state_filePath)
+    if uidvalidity is not None \
+            and watermark.get('uidvalidity') == uidvalidity:
+        first_uid = watermark.get('uid', 0) + 1
+        attempts = watermark.get('attempts', {})
+    else:
+        first_uid = 1
+        attempts = {}
+        if watermark:
+            logging.info(
+                f"{prefix} - UIDVALIDITY changed, rescanning mailbox.")
+    last_uid = max(first_uid - 1, (uidnext or 1) - 1)
+
+    # one search for the keywords of all list types, the subject
+    # (and sender) are still verified by the handlers
+    with metrics.span('search'):
+        if owner.server_search:
+            senders = None
+            if owner.search_senders:
+                senders = [
+                    sender for handler in handlers
+                    for sender in handler.senders.searchTerms()
+                ]
+            uids = searchCandidates(
+                imap, owner.dispatcher.keywords(), senders, first_uid)
+        else:
+            uids = searchAll(imap, first_uid)
+
+    # replies are sent by the workers while the scan continues
+    deliveries = {}
+    requests = {}
+    duplicates = {}
+    handled = []
+    owners = {}
+    with ThreadPoolExecutor(max_workers=owner.workers) as pool:
+        for uid, msg in fetchHeaders(
+                imap, uids, owner.fetch_batch_size, metrics):
+
+            last_uid = max(last_uid, int(uid))
+            metrics.count('scanned')
+
+            with metrics.span('parse'):
+                subject, sender = decodeHeaders(msg)
+
+            request = owner.dispatcher.resolve(subject)
+            if request is not None:
+                metrics.count('matched')
+                handler, command, argument = request
+                key = (handler, sender.lower(), command, argument)
+                if key in requests:
+                    # the same request twice in one scan, one reply
+                    duplicates[uid] = requests[key]
+                    metrics.count('coalesced')
+                    continue
+                job = handler.handleMessage(sender, command, argument)
+                if job is None:
+                    if handler.markDeleted(uid):
+                        handled.append(uid)
+                else:
+                    deliveries[uid] = pool.submit(job)
+                    requests[key] = uid
+                    owners[uid] = handler
+
+            else:
+                if owner.verbose_logging:
+                    logging.info(
+                        f"{prefix} - Subject not recognized. "
+                        f"Skipping message. "
+                        f"{sender}"
+                    )
+
+                    owner.writeLog(
+                        False,
+                        f"{prefix} - Subject not recognized. "
+                        f"Skipping message. {sender}\n",
+                        action='skipped', sender=sender
+                    )
+
+    # a request is only deleted once its reply went out, failed ones
+    # are picked up again by the next run, up to MAX_ATTEMPTS times
+    failed, postponed, undeliverable = finishDeliveries(deliveries)
+    metrics.count(
+        'send_failures', len(failed) + len(postponed) + len(undeliverable))
+    retries = {
+        str(int(uid)): attempts[str(int(uid))]
+        for uid in postponed if str(int(uid)) in attempts
+    }
+    for uid in sorted(failed, key=int):
+        tries = attempts.get(str(int(uid)), 0) + 1
+        if tries < MAX_ATTEMPTS:
+            retries[str(int(uid))] = tries
+        else:
+            logging.error(
+                f"{prefix} - Reply for message {int(uid)} failed "
+                f"{tries} times, giving up.")
+            failed.discard(uid)
+            undeliverable.add(uid)
+    metrics.count('undeliverable', len(undeliverable))
+    failed |= postponed
+
+    # messages that won't get a reply stay in the mailbox, but only the
+    # failed ones hold the watermark back, so the others aren't retried
+    kept = failed | undeliverable
+    for uid in deliveries:
+        if uid not in kept and owners[uid].markDeleted(uid):
+            handled.append(uid)
+    for uid, original in duplicates.items():
+        if original not in kept and owners[original].markDeleted(uid):
+            handled.append(uid)
+    if failed:
+        last_uid = min(last_uid, min(int(uid) for uid in failed) - 1)
+
+    # one UID STORE (or MOVE) for all handled requests of the run
+    with metrics.span('expunge'):
+        if removeMessages(imap, handled, owner.archive_folder):
+            metrics.count('deleted', len(handled))
+
+    if not owner.dry_run and uidvalidity is not None:
+        writeState(
+            owner.state_filePath,
+            {'uidvalidity': uidvalidity, 'uid': last_uid,
+             'attempts': retries}
+        )
+
+    owner.pushover.flush()
+    owner.log.flush()
+    for handler in handlers:
+        if handler is not owner:
+            handler.log.flush()
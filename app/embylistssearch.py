@@ -0,0 +1,124 @@
+# Name: embylistssearch
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""Title search over the list files, for "search <term>" requests."""
+
+import bisect
+import re
+import unicodedata
+
+from embylistspayload import PayloadCache
+
+# answer the search command
+SEARCH = 'SEARCH'
+
+# at most this many titles are sent back for one search
+MAX_RESULTS = 200
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Return the lowercase, accent-free words of text."""
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+
+    return TOKEN_RE.findall(text)
+
+
+class ListIndex():
+    """Maps the words of a list file to the lines they appear on.
+
+    A search word matches the words it is a prefix of ("matr" finds
+    "Matrix"). Words that match nothing are looked up fuzzily among the
+    words of about the same length, so small typos still find the title.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.postings = {}
+
+        for number, line in enumerate(lines):
+            for token in tokenize(line):
+                self.postings.setdefault(token, set()).add(number)
+
+        self.vocabulary = sorted(self.postings)
+
+    @classmethod
+    def fromFile(cls, list_filePath):
+        with open(list_filePath, 'r', encoding='utf-8',
+                  errors='replace') as listfile:
+            return cls(
+                [line.rstrip('\n') for line in listfile if line.strip()])
+
+    def matchToken(self, token):
+        """Return the line numbers holding token, or a word it starts."""
+        found = set()
+
+        start = bisect.bisect_left(self.vocabulary, token)
+        for word in self.vocabulary[start:]:
+            if not word.startswith(token):
+                break
+            found |= self.postings[word]
+
+        if not found and len(token) > 2:
+            # imported here, only a misspelled word needs it
+            import difflib
+
+            candidates = [
+                word for word in self.vocabulary
+                if abs(len(word) - len(token)) <= 2 and word[0] == token[0]
+            ]
+            for word in difflib.get_close_matches(
+                    token, candidates, n=5, cutoff=0.8):
+                found |= self.postings[word]
+
+        return found
+
+    def search(self, term):
+        """Return the lines matching every word of term, in list order."""
+        tokens = tokenize(term)
+        if not tokens:
+            return []
+
+        found = None
+        for token in sorted(tokens, key=len, reverse=True):
+            lines = self.matchToken(token)
+            found = lines if found is None else found & lines
+            if not found:
+                return []
+
+        return [self.lines[number] for number in sorted(found)]
+
+
+class SearchIndex():
+    """Keeps one ListIndex per list file, rebuilt when the file changes."""
+
+    def __init__(self):
+        self.cache = PayloadCache()
+
+    def search(self, list_filePath, term):
+        index = self.cache.get(
+            str(list_filePath), [list_filePath],
+            lambda: ListIndex.fromFile(list_filePath)
+        )
+
+        return index.search(term)
+
+
+def searchBody(term, lines):
+    """Return the Dutch mail text for the result of a search."""
+    if not lines:
+        return (
+            f"Hi,\n\nNiets gevonden voor \"{term}\".\n\n"
+            "Fijne dag!\n\n"
+        )
+
+    body = f"Gevonden voor \"{term}\" ({len(lines)}):\n\n"
+    body += "\n".join(lines[:MAX_RESULTS]) + "\n"
+    if len(lines) > MAX_RESULTS:
+        body += f"\n... en nog {len(lines) - MAX_RESULTS} titels.\n"
+
+    return body
@@ -0,0 +1,126 @@
+# Name: embylistssenders
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""Which senders may request a list, and which list they get."""
+
+import logging
+import threading
+from pathlib import Path
+
+from embylistspayload import fileKey
+
+# the lists a sender can be routed to, the first tier wins when a
+# sender is listed more than once
+REGULAR = 'REGULAR'
+DV = 'DV'
+TIERS = (REGULAR, DV)
+
+
+def parseSenders(text):
+    """Return the addresses and *@domain rules in a comma separated text."""
+    return [s.strip().lower() for s in text.split(',') if s.strip()]
+
+
+def compileRules(rules):
+    """Return (addresses, domains) dicts mapping senders to their tier.
+
+    rules is a list of (tier, entry) pairs, where entry is an address or
+    a *@domain rule. Earlier pairs take precedence over later ones.
+    """
+    addresses = {}
+    domains = {}
+
+    for tier, entry in rules:
+        entry = entry.strip().lower()
+        if entry.startswith('*@'):
+            domains.setdefault(entry[2:], tier)
+        elif entry:
+            addresses.setdefault(entry, tier)
+
+    return addresses, domains
+
+
+def readAllowlist(path, tiers=TIERS):
+    """Return the (tier, entry) pairs of an allowlist file.
+
+    Every line holds an address or *@domain rule, optionally followed by
+    one of tiers (REGULAR when left out). Lines starting with # are
+    comments.
+    """
+    rules = []
+
+    with open(path, 'r', encoding='utf-8') as allowlist:
+        for number, line in enumerate(allowlist, 1):
+            fields = line.split('#', 1)[0].split()
+            if not fields:
+                continue
+            tier = fields[1].upper() if len(fields) > 1 else REGULAR
+            if tier not in tiers or len(fields) > 2:
+                logging.warning(
+                    f"Ignoring line {number} of {path}: {line.strip()}")
+                continue
+            rules.append((tier, fields[0]))
+
+    return rules
+
+
+class SenderIndex():
+    """Looks up the tier of a sender with one dict lookup.
+
+    Built once from the ALLOWED_SENDERS settings. When an allowlist file
+    is given its rules are added after those, and re-read whenever the
+    file changes on disk.
+    """
+
+    def __init__(self, rules, allowlist_filePath=None, tiers=TIERS):
+        self.rules = list(rules)
+        self.tiers = tiers
+        self.allowlist_filePath = \
+            Path(allowlist_filePath) if allowlist_filePath else None
+        self.lock = threading.Lock()
+
+        self.key = None
+        self.index = compileRules(self.rules)
+        self.reload()
+
+    def reload(self):
+        if self.allowlist_filePath is None:
+            return
+
+        key = fileKey([self.allowlist_filePath])
+        if key == self.key:
+            return
+
+        with self.lock:
+            if key == self.key:
+                return
+            try:
+                extra = readAllowlist(self.allowlist_filePath, self.tiers)
+            except IOError as e:
+                logging.error(
+                    f"Can't read allowlist {self.allowlist_filePath}: {e}")
+                extra = []
+            # swap both maps at once, lookups never see a mix
+            self.index = compileRules(self.rules + extra)
+            self.key = key
+
+    def lookup(self, sender):
+        """Return the tier of sender, or None when it isn't allowed."""
+        self.reload()
+
+        addresses, domains = self.index
+        address = sender.strip().lower()
+        tier = addresses.get(address)
+        if tier is None:
+            tier = domains.get(address.rpartition('@')[2])
+
+        return tier
+
+    def searchTerms(self):
+        """Return FROM search terms that cover every allowed sender."""
+        self.reload()
+
+        addresses, domains = self.index
+        return list(addresses) + [f"@{domain}" for domain in domains]
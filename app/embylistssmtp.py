@@ -0,0 +1,285 @@
+# Name: embylistssmtp
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""SMTP sessions shared by all replies of a run or daemon cycle.
+
+smtplib is imported where it is used, so a run that sends no replies
+doesn't load it, nor the email package it pulls in.
+"""
+
+import logging
+import queue
+import re
+import threading
+
+# lines starting with a dot get a second one in the DATA stream
+DOT_RE = re.compile(rb'(?m)^\.')
+
+
+class UndeliverableError(Exception):
+    """A reply that can never be delivered, retrying it is pointless."""
+
+
+class UnavailableError(Exception):
+    """The mail server can't take replies now, the reply itself is fine.
+
+    E.g. it can't be reached, or it refused the login or the sender.
+    """
+
+
+def messageError(error):
+    """Return True when the server refused the reply, not the session.
+
+    Only a refusal of the recipients or the data is about the reply
+    itself, anything else (connect, login, MAIL FROM) is about the server.
+    """
+    import smtplib
+
+    return isinstance(
+        error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError))
+
+
+def permanentError(error):
+    """Return True when the server refused the reply with a 5xx reply.
+
+    That is every recipient refused with a 5xx code, or a 5xx reply to
+    the data, see RFC 5321. Retrying these can't succeed.
+    """
+    import smtplib
+
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(
+            500 <= code < 600 for code, response in error.recipients.values())
+
+    if isinstance(error, smtplib.SMTPDataError):
+        return 500 <= error.smtp_code < 600
+
+    return False
+
+
+def resetQuietly(session):
+    import smtplib
+
+    try:
+        session.rset()
+    except smtplib.SMTPServerDisconnected:
+        pass
+
+
+def streamMail(session, from_addr, to_addrs, chunks):
+    """Like SMTP.sendmail(), but send the message from chunks of bytes.
+
+    The chunks are written to the DATA stream as they come, so the
+    message never has to be held in memory as a whole. They must hold
+    CRLF terminated lines.
+    """
+    import smtplib
+
+    session.ehlo_or_helo_if_needed()
+
+    code, response = session.mail(from_addr)
+    if code != 250:
+        if code == 421:
+            session.close()
+        else:
+            resetQuietly(session)
+        raise smtplib.SMTPSenderRefused(code, response, from_addr)
+
+    refused = {}
+    for address in to_addrs:
+        code, response = session.rcpt(address)
+        if code not in (250, 251):
+            refused[address] = (code, response)
+    if len(refused) == len(to_addrs):
+        resetQuietly(session)
+        raise smtplib.SMTPRecipientsRefused(refused)
+
+    code, response = session.docmd('data')
+    if code != 354:
+        resetQuietly(session)
+        raise smtplib.SMTPDataError(code, response)
+
+    # only whole lines are dot-stuffed, a partial one waits for the rest
+    pending = b''
+    for chunk in chunks:
+        data = pending + chunk
+        cut = data.rfind(b'\n') + 1
+        pending = data[cut:]
+        if cut:
+            session.send(DOT_RE.sub(b'..', data[:cut]))
+    if pending:
+        session.send(DOT_RE.sub(b'..', pending) + b'\r\n')
+    session.send(b'.\r\n')
+
+    code, response = session.getreply()
+    if code != 250:
+        resetQuietly(session)
+        raise smtplib.SMTPDataError(code, response)
+
+    return refused
+
+
+class SMTPSession():
+
+    def __init__(self, server, port, login, password, idle_timeout=60):
+        self.server = server
+        self.port = port
+        self.login = login
+        self.password = password
+        self.idle_timeout = idle_timeout
+
+        self.session = None
+        self.timer = None
+        self.lock = threading.RLock()
+
+    def connect(self):
+        import smtplib
+
+        session = smtplib.SMTP(self.server, self.port)
+        try:
+            session.starttls()
+            session.login(self.login, self.password)
+        except BaseException:
+            session.close()
+            raise
+
+        self.session = session
+
+    def transfer(self, from_addr, to_addrs, msg):
+        if callable(msg):
+            return streamMail(self.session, from_addr, to_addrs, msg())
+        return self.session.sendmail(from_addr, to_addrs, msg)
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        """Send msg, opening the session first if needed.
+
+        msg is the message, or a callable returning its chunks of bytes
+        (see streamMail()). A session the server dropped since the
+        previous mail is re-established once, transparently.
+        """
+        import smtplib
+
+        with self.lock:
+            self.cancelTimer()
+            try:
+                reused = self.session is not None
+                if not reused:
+                    self.connect()
+
+                try:
+                    return self.transfer(from_addr, to_addrs, msg)
+                except smtplib.SMTPServerDisconnected:
+                    self.session = None
+                    if not reused:
+                        raise
+                    logging.info("SMTP session was closed, reconnecting.")
+
+                self.connect()
+                return self.transfer(from_addr, to_addrs, msg)
+
+            except (smtplib.SMTPRecipientsRefused,
+                    smtplib.SMTPResponseException):
+                # the server answered, so the session itself is fine
+                raise
+
+            except OSError:
+                self.drop()
+                raise
+
+            finally:
+                self.startTimer()
+
+    def close(self):
+        """Say goodbye to the server, if a session is open."""
+        with self.lock:
+            self.cancelTimer()
+            if self.session is None:
+                return
+            import smtplib
+
+            try:
+                self.session.quit()
+            except (smtplib.SMTPException, OSError):
+                self.drop()
+            self.session = None
+
+    def drop(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+    def startTimer(self):
+        # close the session when it has been idle for idle_timeout seconds
+        if self.session is None or not self.idle_timeout:
+            return
+        self.timer = threading.Timer(self.idle_timeout, self.close)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def cancelTimer(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+
+class SMTPPool():
+    """Up to size SMTP sessions, so replies can be sent concurrently.
+
+    Sessions are only opened when they are needed, the most recently
+    used one is handed out first.
+    """
+
+    def __init__(
+            self, server, port, login, password, idle_timeout=60, size=1):
+        self.sessions = [
+            SMTPSession(server, port, login, password, idle_timeout)
+            for _ in range(max(1, size))
+        ]
+        self.idle = queue.LifoQueue()
+        for session in reversed(self.sessions):
+            self.idle.put(session)
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        session = self.idle.get()
+        try:
+            return session.sendmail(from_addr, to_addrs, msg)
+        finally:
+            self.idle.put(session)
+
+    def close(self):
+        for session in self.sessions:
+            session.close()
+
+
+def finishDeliveries(deliveries):
+    """Wait for the reply jobs in deliveries, a dict of uid: future.
+
+    Returns (failed, postponed, undeliverable), the sets of uids whose
+    reply failed this time, whose reply wasn't sent because the mail
+    server was unavailable and whose reply will never be delivered.
+    """
+    failed = set()
+    postponed = set()
+    undeliverable = set()
+
+    for uid, future in deliveries.items():
+        try:
+            if not future.result():
+                failed.add(uid)
+        except UndeliverableError as e:
+            logging.error(
+                f"Reply for message {int(uid)} can't be delivered, "
+                f"giving up: {e}")
+            undeliverable.add(uid)
+        except (UnavailableError, OSError) as e:
+            logging.error(
+                f"Reply for message {int(uid)} postponed, "
+                f"the mail server is unavailable: {e}")
+            postponed.add(uid)
+        except Exception as e:
+            logging.error(f"Reply for message {int(uid)} failed: {e}")
+            failed.add(uid)
+
+    return failed, postponed, undeliverable
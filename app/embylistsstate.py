@@ -0,0 +1,45 @@
+# Name: embylistsstate
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""Small JSON state files kept next to embylists.ini."""
+
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+
+def readState(path, default=None):
+    """Return the contents of state file path, or default if unusable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as statefile:
+            return json.load(statefile)
+    except FileNotFoundError:
+        pass
+    except (IOError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable state file {path}: {e}")
+
+    return {} if default is None else default
+
+
+def writeState(path, data):
+    """Atomically replace state file path with data."""
+    path = Path(path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(
+            dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as statefile:
+                json.dump(data, statefile)
+                statefile.flush()
+                os.fsync(statefile.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except IOError as e:
+        logging.error(f"Can't write state file {path}: {e}")
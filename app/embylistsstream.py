@@ -0,0 +1,168 @@
+# Name: embylistsstream
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""Replies whose list files are read from disk while they are sent."""
+
+import base64
+import io
+import mmap
+import os
+import uuid
+
+from email import policy
+from email.generator import BytesGenerator
+from email.header import Header
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+
+# bytes encoded at a time, whole base64 lines (57 bytes each) and whole
+# pages, so the pages of a block can be released once it is sent
+BLOCK_SIZE = 57 * mmap.PAGESIZE
+
+
+def filesSize(paths):
+    """Return the total size of the files in paths that exist."""
+    size = 0
+
+    for path in paths:
+        try:
+            size += os.stat(path).st_size
+        except OSError:
+            pass
+
+    return size
+
+
+def readBlocks(path):
+    """Yield the content of path in blocks, read from a memory map."""
+    with open(path, 'rb') as source:
+        if not os.fstat(source.fileno()).st_size:
+            return
+
+        with mmap.mmap(
+                source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+
+            for start in range(0, len(mapped), BLOCK_SIZE):
+                yield mapped[start:start + BLOCK_SIZE]
+                if hasattr(mmap, 'MADV_DONTNEED'):
+                    # the pages stay in the page cache, not in our RSS
+                    mapped.madvise(
+                        mmap.MADV_DONTNEED, start,
+                        min(BLOCK_SIZE, len(mapped) - start))
+
+
+def encodeBase64(blocks):
+    """Yield blocks base64 encoded, as CRLF separated 76 character lines.
+
+    The last line is not terminated, the MIME boundary that follows it
+    starts with a line break of its own.
+    """
+    rest = b''
+    separator = b''
+
+    for block in blocks:
+        data = rest + block
+        cut = len(data) - len(data) % 57
+        rest = data[cut:]
+        if cut:
+            yield separator + encodeLines(data[:cut])
+            separator = b'\r\n'
+
+    if rest:
+        yield separator + encodeLines(rest)
+
+
+def encodeLines(data):
+    return base64.encodebytes(data).rstrip(b'\n').replace(b'\n', b'\r\n')
+
+
+def attachmentPart(filename):
+    """Return the headers of a base64 encoded file attachment."""
+    part = MIMEBase('application', 'octet-stream', policy=policy.SMTP)
+    part['Content-Transfer-Encoding'] = 'base64'
+    part.add_header('Content-Disposition', 'attachment', filename=filename)
+
+    return part
+
+
+def textPart():
+    """Return the headers of a base64 encoded UTF-8 text body."""
+    part = MIMEBase('text', 'plain', charset='utf-8', policy=policy.SMTP)
+    part['Content-Transfer-Encoding'] = 'base64'
+
+    return part
+
+
+class StreamingPayload():
+    """A reply message of which only the headers are kept in memory.
+
+    Every part is filled from its sources, bytes or file paths, when the
+    message is sent. The files are memory-mapped and encoded block by
+    block, so the memory used doesn't grow with the size of the lists.
+    The MIME structure itself is written by BytesGenerator, with a
+    marker where the content of each part goes.
+    """
+
+    def __init__(self, sender, subject):
+        self.marker = f"=={uuid.uuid4().hex}=="
+        self.message = MIMEMultipart(
+            boundary=f"==============={uuid.uuid4().hex}==",
+            policy=policy.SMTP
+        )
+        self.message['From'] = sender
+        self.message['Subject'] = subject
+        self.sources = []
+
+    def attach(self, part, *sources):
+        part.set_payload(self.marker)
+        self.message.attach(part)
+        self.sources.append(sources)
+
+    def skeleton(self):
+        buffer = io.BytesIO()
+        BytesGenerator(buffer, mangle_from_=False).flatten(self.message)
+
+        return buffer.getvalue().split(self.marker.encode('ascii'))
+
+    def chunks(self, receiver):
+        """Yield the message addressed to receiver, in CRLF bytes."""
+        pieces = self.skeleton()
+
+        yield f"To: {Header(receiver).encode()}\r\n".encode('ascii')
+        yield pieces[0]
+        for sources, piece in zip(self.sources, pieces[1:]):
+            yield from encodeBase64(self.read(sources))
+            yield piece
+
+    def read(self, sources):
+        for source in sources:
+            if isinstance(source, bytes):
+                yield source
+            else:
+                yield from readBlocks(source)
+
+    def addressedTo(self, receiver):
+        return MessageStream(self, receiver)
+
+
+class MessageStream():
+    """One send of a StreamingPayload, call it for the message chunks.
+
+    It can be called again when the send is retried, size holds the
+    number of bytes of the last call.
+    """
+
+    def __init__(self, payload, receiver):
+        self.payload = payload
+        self.receiver = receiver
+        self.size = 0
+
+    def __call__(self):
+        self.size = 0
+        for chunk in self.payload.chunks(self.receiver):
+            self.size += len(chunk)
+            yield chunk
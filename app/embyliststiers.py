@@ -0,0 +1,124 @@
+# Name: embyliststiers
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""The list variants (tiers) a list type is served in."""
+
+from pathlib import Path
+
+from embylistssenders import DV, REGULAR, parseSenders
+
+
+class ListTier():
+    """One variant of a list, e.g. the regular, DV or 4K movies list.
+
+    list_filePath goes in the mail body (or is compressed), the files in
+    attachments are attached. subject may use {node} for the node name.
+    """
+
+    def __init__(self, name, list_filePath, attachments, subject, senders):
+        self.name = name
+        self.list_filePath = Path(list_filePath)
+        self.attachments = [Path(path) for path in attachments]
+        self.subject = subject
+        self.senders = senders
+
+    def paths(self):
+        return [self.list_filePath] + self.attachments
+
+
+def checkSubject(subject, where):
+    """Raise ValueError if subject uses anything but {node}."""
+    try:
+        subject.format(node='')
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError(f"Invalid SUBJECT in [{where}]: {e!r}") from e
+
+    return subject
+
+
+def loadTiers(config, section, config_dir, regular, dv, subject):
+    """Return {name: ListTier} for the list type in section.
+
+    regular and dv are the (list file, attachment files) of the built-in
+    REGULAR and DV tiers, which get ALLOWED_SENDERS and ALLOWED_SENDERSDV.
+    Every [<section>:<NAME>] section adds a tier with its own LIST,
+    ATTACHMENTS, SUBJECT and SENDERS. A sender listed in more than one
+    tier gets the first: REGULAR, DV, then the others in INI order.
+    A SUBJECT with a placeholder other than {node} raises ValueError.
+    """
+    config_dir = Path(config_dir)
+    checkSubject(subject, section)
+
+    tiers = {
+        REGULAR: ListTier(
+            REGULAR, config_dir / regular[0],
+            [config_dir / name for name in regular[1]], subject,
+            parseSenders(
+                config.get(section, 'ALLOWED_SENDERS', fallback=''))
+        ),
+        DV: ListTier(
+            DV, config_dir / dv[0],
+            [config_dir / name for name in dv[1]], subject,
+            parseSenders(
+                config.get(section, 'ALLOWED_SENDERSDV', fallback=''))
+        ),
+    }
+
+    prefix = f"{section}:"
+    for tier_section in config.sections():
+        if not tier_section.startswith(prefix):
+            continue
+
+        name = tier_section[len(prefix):].strip().upper()
+        if not name or name in tiers:
+            raise ValueError(f"Duplicate or empty tier [{tier_section}]")
+
+        list_file = config.get(tier_section, 'LIST', fallback='')
+        if not list_file:
+            raise ValueError(f"LIST is missing in [{tier_section}]")
+
+        tiers[name] = ListTier(
+            name,
+            config_dir / list_file,
+            [
+                config_dir / attachment.strip() for attachment in config.get(
+                    tier_section, 'ATTACHMENTS', fallback='').split(',')
+                if attachment.strip()
+            ],
+            checkSubject(
+                config.get(tier_section, 'SUBJECT', fallback=subject),
+                tier_section),
+            parseSenders(config.get(tier_section, 'SENDERS', fallback=''))
+        )
+
+    return tiers
+
+
+def tierRules(tiers):
+    """Return the (tier, sender) rules of tiers for a SenderIndex."""
+    return [
+        (tier.name, sender)
+        for tier in tiers.values() for sender in tier.senders
+    ]
+
+
+def dumpTiers(tiers):
+    """Return tiers as JSON-able data, see restoreTiers()."""
+    return [
+        [
+            tier.name, str(tier.list_filePath),
+            [str(path) for path in tier.attachments],
+            tier.subject, tier.senders
+        ]
+        for tier in tiers.values()
+    ]
+
+
+def restoreTiers(data):
+    """Return the {name: ListTier} that dumpTiers() returned data for."""
+    return {
+        name: ListTier(name, list_file, attachments, subject, senders)
+        for name, list_file, attachments, subject, senders in data
+    }
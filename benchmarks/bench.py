@@ -0,0 +1,319 @@
+# Name: bench
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""Offline benchmark of the emby_lists mail scripts.
+
+Every scenario starts a local IMAP (SSL) and SMTP server, fills the
+mailbox with synthetic mail, runs one of the scripts against it in a
+child process and records wall time, round trips, bytes transferred
+and peak RSS. Results are written as JSON, --compare prints the change
+against an earlier result file.
+
+    python benchmarks/bench.py --messages 1000,10000 --output new.json
+    python benchmarks/bench.py --compare old.json --output new.json
+"""
+
+import argparse
+import configparser
+import itertools
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import fakemail
+
+APP_DIR = Path(__file__).resolve().parent.parent / 'app'
+
+SCRIPTS = {
+    'movies': 'embylistsmoviesbymail.py',
+    'series': 'embylistsseriesbymail.py',
+    'all': 'embylistsbymail.py',
+}
+
+KEYWORDS = {'MOVIES': 'movies please', 'SERIES': 'series please'}
+SENDERS = ['user1@domain1.tld', 'user2@domain2.tld', 'user4@domain4.tld']
+LISTS = ('movieslist', 'moviesdvlist', 'serieslist', 'seriesdvlist')
+
+
+def makeCertificate(directory):
+    cert = directory / 'cert.pem'
+    key = directory / 'key.pem'
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+         '-keyout', str(key), '-out', str(cert), '-days', '1',
+         '-subj', '/CN=localhost'],
+        check=True, capture_output=True
+    )
+
+    return cert, key
+
+
+def writeConfig(config_dir, imap_port, smtp_port, extra):
+    config = configparser.ConfigParser()
+    config.read(APP_DIR / 'embylists.ini.example')
+
+    config['GENERAL']['DRY_RUN'] = 'OFF'
+    config['GENERAL']['VERBOSE_LOGGING'] = 'OFF'
+    config['MAIL']['MAIL_SERVER'] = '127.0.0.1'
+    config['MAIL']['MAIL_IMAP_PORT'] = str(imap_port)
+    config['MAIL']['MAIL_PORT'] = str(smtp_port)
+    for section, keyword in KEYWORDS.items():
+        config[section]['KEYWORD'] = keyword
+        config[section]['ALLOWED_SENDERS'] = ','.join(SENDERS[:2])
+        config[section]['ALLOWED_SENDERSDV'] = SENDERS[2]
+    # no notifications from a benchmark
+    config['PUSHOVER']['USER_KEY'] = ''
+    config['PUSHOVER']['TOKEN_API'] = ''
+    config['METRICS']['SUMMARY'] = 'ON'
+
+    for setting in extra:
+        name, value = setting.split('=', 1)
+        section, key = name.split('.', 1)
+        if not config.has_section(section):
+            config.add_section(section)
+        config[section][key] = value
+
+    with open(config_dir / 'embylists.ini', 'w') as configfile:
+        config.write(configfile)
+
+
+def writeLists(config_dir, lines):
+    for name in LISTS:
+        with open(config_dir / f"{name}.txt", 'w', encoding='utf-8') as f:
+            for number in range(lines):
+                f.write(f"{name} title {number:07d} (2024)\n")
+        # the alphabetical versions are attached by the movies script
+        (config_dir / f"{name}_alphabetical.txt").write_bytes(
+            (config_dir / f"{name}.txt").read_bytes())
+
+
+def seedMailbox(mailbox, messages, match_share, attachment_share,
+                attachment_size, script):
+    """Fill mailbox, every 1/match_share-th message is a request."""
+    sections = ['MOVIES', 'SERIES'] if script == 'all' else \
+        ['SERIES' if script == 'series' else 'MOVIES']
+    every = max(1, round(1 / match_share)) if match_share else 0
+    attach_every = max(1, round(1 / attachment_share)) \
+        if attachment_share else 0
+    senders = itertools.cycle(SENDERS + ['stranger@elsewhere.tld'])
+    keywords = itertools.cycle(KEYWORDS[section] for section in sections)
+
+    matching = 0
+    for number in range(messages):
+        if every and number % every == every - 1:
+            subject, sender = next(keywords), next(senders)
+            matching += 1
+        else:
+            subject, sender = f"newsletter {number}", 'news@example.com'
+        size = attachment_size \
+            if attach_every and number % attach_every == 0 else 0
+        mailbox.append(fakemail.makeMessage(
+            subject, sender, attachment_size=size))
+
+    return matching
+
+
+# Runs a script and reports its peak RSS. The peak of the benchmark
+# itself, which holds the whole synthetic mailbox, would otherwise be
+# inherited through fork() and hide the script's own.
+LAUNCHER = """
+import atexit, resource, runpy, sys
+
+def peak():
+    kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        kib //= 1024
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    kib = int(line.split()[1])
+    except OSError:
+        pass
+    sys.stderr.write(f"PEAK_RSS {kib}\\n")
+
+atexit.register(peak)
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name='__main__')
+"""
+
+
+def runScript(script, env):
+    """Run script, return (seconds, peak RSS in KiB, stderr)."""
+    started = time.monotonic()
+    process = subprocess.run(
+        [sys.executable, '-c', LAUNCHER, SCRIPTS[script]],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE, text=True, errors='replace'
+    )
+    seconds = time.monotonic() - started
+
+    if process.returncode != 0:
+        raise RuntimeError(
+            f"{SCRIPTS[script]} exited with {process.returncode}:\n"
+            f"{process.stderr}")
+
+    peak = re.findall(r'^PEAK_RSS (\d+)$', process.stderr, re.M)
+
+    return seconds, int(peak[-1]) if peak else None, process.stderr
+
+
+def runSummary(stderr):
+    summaries = re.findall(r'Run summary (\{.*\})', stderr)
+    return json.loads(summaries[-1]) if summaries else None
+
+
+def scenario(args, cert, key, script, messages, list_lines):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        config_dir = tmp / 'config'
+        config_dir.mkdir()
+
+        imap = fakemail.serve(fakemail.FakeIMAPServer(cert, key))
+        smtp = fakemail.serve(fakemail.FakeSMTPServer(cert, key))
+        try:
+            matching = seedMailbox(
+                imap.mailbox, messages, args.match_share,
+                args.attachment_share, args.attachment_size, script)
+            writeConfig(
+                config_dir, imap.server_address[1], smtp.server_address[1],
+                args.set)
+            writeLists(config_dir, list_lines)
+
+            env = dict(
+                os.environ,
+                EMBYLISTS_CONFIG_DIR=str(config_dir),
+                EMBYLISTS_LOG_DIR=str(tmp / 'log'),
+                EMBYLISTS_APP_DIR=str(APP_DIR),
+            )
+            seconds, peak, stderr = runScript(script, env)
+
+            return {
+                'script': script,
+                'messages': messages,
+                'matching': matching,
+                'list_lines': list_lines,
+                'attachment_size': args.attachment_size,
+                'attachment_share': args.attachment_share,
+                'wall_seconds': round(seconds, 3),
+                'peak_rss_kib': peak,
+                'imap_round_trips': imap.stats.round_trips,
+                'imap_commands': imap.stats.commands,
+                'imap_bytes_in': imap.stats.bytes_in,
+                'imap_bytes_out': imap.stats.bytes_out,
+                'smtp_round_trips': smtp.stats.round_trips,
+                'smtp_bytes_in': smtp.stats.bytes_in,
+                'smtp_bytes_out': smtp.stats.bytes_out,
+                'replies': len(smtp.received),
+                'left_in_inbox': len(imap.mailbox.messages),
+                'summary': runSummary(stderr),
+            }
+        finally:
+            imap.shutdown()
+            smtp.shutdown()
+            imap.server_close()
+            smtp.server_close()
+
+
+def scenarioKey(result):
+    return (result['script'], result['messages'], result['list_lines'])
+
+
+def compare(old_results, new_results):
+    old = {scenarioKey(result): result for result in old_results}
+
+    print()
+    print(f"{'scenario':<32} {'wall':>18} {'round trips':>18} "
+          f"{'peak RSS':>18}")
+    for result in new_results:
+        before = old.get(scenarioKey(result))
+        if before is None:
+            continue
+        columns = []
+        for name in ('wall_seconds', 'imap_round_trips', 'peak_rss_kib'):
+            if not before[name] or result[name] is None:
+                columns.append(f"{before[name]}->{result[name]}")
+                continue
+            change = (result[name] - before[name]) / before[name] * 100
+            columns.append(f"{before[name]}->{result[name]} {change:+.0f}%")
+        name = "{} {}msg {}lines".format(*scenarioKey(result))
+        print(f"{name:<32} " + " ".join(f"{c:>18}" for c in columns))
+
+
+def numbers(text):
+    return [int(value) for value in text.split(',') if value]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--messages', type=numbers, default=[1000, 10000],
+        help="mailbox sizes, comma separated (default 1000,10000)")
+    parser.add_argument(
+        '--match-share', type=float, default=0.01,
+        help="share of messages that request a list (default 0.01)")
+    parser.add_argument(
+        '--attachment-size', type=int, default=0,
+        help="size in bytes of the attachment of other mail (default 0)")
+    parser.add_argument(
+        '--attachment-share', type=float, default=0.1,
+        help="share of messages with an attachment (default 0.1)")
+    parser.add_argument(
+        '--list-lines', type=numbers, default=[5000],
+        help="titles per list file, comma separated (default 5000)")
+    parser.add_argument(
+        '--scripts', default='movies,series',
+        help="scripts to run: movies, series and/or all")
+    parser.add_argument(
+        '--set', action='append', default=[], metavar='SECTION.KEY=VALUE',
+        help="override an INI setting, may be repeated")
+    parser.add_argument(
+        '--output', default='bench_results.json',
+        help="JSON file for the results (default bench_results.json)")
+    parser.add_argument(
+        '--compare', metavar='FILE',
+        help="earlier result file to compare with")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = makeCertificate(Path(tmp))
+
+        for script, messages, list_lines in itertools.product(
+                args.scripts.split(','), args.messages, args.list_lines):
+            result = scenario(args, cert, key, script, messages, list_lines)
+            results.append(result)
+            print(
+                f"{script:<7} {messages:>7} messages {list_lines:>7} lines: "
+                f"{result['wall_seconds']:>8.2f}s "
+                f"{result['imap_round_trips']:>6} IMAP round trips "
+                f"{result['imap_bytes_out']:>11} bytes fetched "
+                f"{result['replies']:>5} replies "
+                f"{result['peak_rss_kib']:>7} KiB peak"
+            )
+
+    with open(args.output, 'w') as output:
+        json.dump({
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'settings': vars(args),
+            'results': results,
+        }, output, indent=2)
+
+    if args.compare:
+        with open(args.compare) as previous:
+            compare(json.load(previous)['results'], results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# Name: buildbench
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""Offline benchmark of embylistsbuild.py against a local Emby stand-in.
+
+Builds the lists of a synthetic library from scratch, then again after
+a few items were added and after one was removed, and reports the wall
+time, API requests and items transferred of every build.
+
+    python benchmarks/buildbench.py --items 50000 --added 5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fakeemby
+
+APP_DIR = Path(__file__).resolve().parent.parent / 'app'
+
+
+def writeConfig(config_dir, url, page_size):
+    with open(config_dir / 'embylists.ini', 'w') as configfile:
+        configfile.write(
+            "[EMBY]\n"
+            f"SERVER_URL = {url}\n"
+            f"API_KEY = {fakeemby.API_KEY}\n"
+            f"PAGE_SIZE = {page_size}\n"
+            "FULL_REFRESH = 24\n\n"
+            "[EMBY:movieslist]\n"
+            "ITEM_TYPES = Movie\n\n"
+            "[EMBY:serieslist]\n"
+            "ITEM_TYPES = Series\n"
+        )
+
+
+def build(server, env):
+    before = server.counters()
+    started = time.monotonic()
+    process = subprocess.run(
+        [sys.executable, 'embylistsbuild.py'], cwd=APP_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    seconds = time.monotonic() - started
+
+    if process.returncode != 0:
+        raise RuntimeError(f"embylistsbuild.py failed:\n{process.stderr}")
+
+    after = server.counters()
+    return {
+        'wall_seconds': round(seconds, 3),
+        'requests': after['requests'] - before['requests'],
+        'items': after['items'] - before['items'],
+        'bytes': after['bytes'] - before['bytes'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--items', type=int, default=50000,
+        help="items in the library, 4 movies to 1 series (default 50000)")
+    parser.add_argument(
+        '--added', type=int, default=5,
+        help="items added before the incremental build (default 5)")
+    parser.add_argument(
+        '--page-size', type=int, default=500,
+        help="items per API request (default 500)")
+    args = parser.parse_args()
+
+    server = fakeemby.serve(fakeemby.FakeEmbyServer())
+    library = server.library
+    for number in range(args.items):
+        item_type = 'Series' if number % 5 == 4 else 'Movie'
+        library.add(f"{item_type} title {number:07d}", item_type)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_dir = Path(tmp) / 'config'
+        config_dir.mkdir()
+        writeConfig(config_dir, server.url(), args.page_size)
+        env = dict(
+            os.environ,
+            EMBYLISTS_CONFIG_DIR=str(config_dir),
+            EMBYLISTS_LOG_DIR=str(Path(tmp) / 'log'),
+            EMBYLISTS_APP_DIR=str(APP_DIR),
+        )
+
+        steps = [('full build', None)]
+        steps.append((f"{args.added} added", lambda: [
+            library.add(f"Movie new {number}", 'Movie')
+            for number in range(args.added)
+        ]))
+        steps.append(("1 removed", lambda: library.remove(
+            next(iter(library.items)))))
+        steps.append(("unchanged", None))
+
+        for name, change in steps:
+            if change:
+                change()
+            result = build(server, env)
+            print(
+                f"{name:<12} {result['wall_seconds']:>8.2f}s "
+                f"{result['requests']:>6} requests "
+                f"{result['items']:>8} items {result['bytes']:>11} bytes"
+            )
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+# Name: fakeemby
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""Local stand-in for the Items API of an Emby server.
+
+Just enough for embylistsbuild.py: paging, IncludeItemTypes, ParentId
+and MinDateLastSaved. The library lives in memory and every request
+and served item is counted.
+"""
+
+import json
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+API_KEY = 'bench-api-key'
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def stamp(tick):
+    """Return tick as an Emby date, e.g. 2020-01-01T00:00:01.0000000Z."""
+    when = EPOCH + timedelta(seconds=tick)
+    return when.strftime('%Y-%m-%dT%H:%M:%S.0000000Z')
+
+
+class Library:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items = {}
+        self.tick = 0
+
+    def add(self, name, item_type='Movie', year=2024, parent_id='lib'):
+        with self.lock:
+            self.tick += 1
+            item_id = uuid.uuid4().hex
+            self.items[item_id] = {
+                'Id': item_id,
+                'Name': name,
+                'SortName': name.lower(),
+                'Type': item_type,
+                'ProductionYear': year,
+                'ParentId': parent_id,
+                'DateCreated': stamp(self.tick),
+                'DateLastSaved': stamp(self.tick),
+            }
+            return item_id
+
+    def touch(self, item_id, **fields):
+        with self.lock:
+            self.tick += 1
+            self.items[item_id].update(fields)
+            self.items[item_id]['DateLastSaved'] = stamp(self.tick)
+
+    def remove(self, item_id):
+        with self.lock:
+            del self.items[item_id]
+
+    def query(self, params):
+        types = set(params.get('IncludeItemTypes', '').split(',')) - {''}
+        parent_id = params.get('ParentId')
+        min_saved = params.get('MinDateLastSaved')
+
+        with self.lock:
+            items = [
+                item for item in self.items.values()
+                if (not types or item['Type'] in types)
+                and (not parent_id or item['ParentId'] == parent_id)
+                and (not min_saved or item['DateLastSaved'] >= min_saved)
+            ]
+
+        return sorted(items, key=lambda item: item['SortName'])
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(
+            url.query).items()}
+        stats = self.server.stats
+
+        if self.headers.get('X-Emby-Token') != API_KEY:
+            self.send_error(401)
+            return
+        if not url.path.endswith('/Items'):
+            self.send_error(404)
+            return
+
+        items = self.server.library.query(params)
+        start = int(params.get('StartIndex', 0))
+        limit = params.get('Limit')
+        page = items[start:start + int(limit)] if limit else items[start:]
+
+        body = json.dumps({
+            'Items': page,
+            'TotalRecordCount': len(items),
+        }).encode()
+
+        with stats['lock']:
+            stats['requests'] += 1
+            stats['items'] += len(page)
+            stats['bytes'] += len(body)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeEmbyServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), Handler)
+        self.library = Library()
+        self.stats = {
+            'lock': threading.Lock(), 'requests': 0, 'items': 0, 'bytes': 0}
+
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def counters(self):
+        with self.stats['lock']:
+            return {
+                key: value for key, value in self.stats.items()
+                if key != 'lock'
+            }
+
+
+def serve(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,586 @@
+# Name: fakemail
+# Coder: Marco Janssen (mastodon @marc0janssen@mastodon.online)
+# date: 2026-10-17 10:00:00
+# update: 2026-10-17 10:00:00
+
+"""Local IMAP4 (SSL) and SMTP (STARTTLS) stand-ins for the benchmarks.
+
+Just enough of both protocols for the emby_lists scripts: the mailbox
+lives in memory and every command, round trip and byte is counted.
+"""
+
+import base64
+import functools
+import re
+import socketserver
+import ssl
+import threading
+from email.parser import BytesHeaderParser
+from email.header import Header, decode_header, make_header
+
+BOUNDARY = '=-=-embylists-bench-=-='
+
+
+def headerText(raw, name):
+    msg = BytesHeaderParser().parsebytes(raw) if raw else None
+    value = msg.get(name, '') if msg is not None else ''
+    try:
+        return str(make_header(decode_header(value)))
+    except Exception:
+        return str(value)
+
+
+class Mailbox:
+
+    def __init__(self, uidvalidity=1):
+        self.lock = threading.Condition()
+        self.uidvalidity = uidvalidity
+        self.uidnext = 1
+        self.messages = []
+        self.folders = {}
+
+    def append(self, raw, folder=None):
+        with self.lock:
+            if folder:
+                self.folders.setdefault(folder, []).append(raw)
+                return
+            self.messages.append(
+                {'uid': self.uidnext, 'flags': set(), 'raw': raw,
+                 'subject': None, 'from': None})
+            self.uidnext += 1
+            self.lock.notify_all()
+
+
+class Stats:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.commands = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def count(self, name):
+        with self.lock:
+            self.commands[name] = self.commands.get(name, 0) + 1
+
+    def sent(self, size):
+        with self.lock:
+            self.bytes_out += size
+
+    def received(self, size):
+        with self.lock:
+            self.bytes_in += size
+
+    @property
+    def round_trips(self):
+        return sum(self.commands.values())
+
+
+TOKEN = re.compile(rb'\s*(\(|\)|"(?:[^"\\]|\\.)*"|\{\d+\+?\}$|[^\s()"]+)')
+
+
+def parseSet(text, maximum):
+    result = []
+    for part in text.split(','):
+        if ':' in part:
+            a, b = part.split(':')
+            a = maximum if a == '*' else int(a)
+            b = maximum if b == '*' else int(b)
+            if a > b:
+                a, b = b, a
+            result.append((a, b))
+        else:
+            n = maximum if part == '*' else int(part)
+            result.append((n, n))
+    return result
+
+
+def inSet(ranges, n):
+    return any(a <= n <= b for a, b in ranges)
+
+
+class IMAPHandler(socketserver.StreamRequestHandler):
+
+    def send(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self.server.stats.sent(len(data))
+        self.wfile.write(data)
+
+    def readline(self):
+        line = self.rfile.readline()
+        self.server.stats.received(len(line))
+        return line
+
+    def readCommand(self):
+        """Read one command, resolving literals, return list of tokens."""
+        tokens = []
+        stack = [tokens]
+        while True:
+            line = self.readline()
+            if not line:
+                return None
+            line = line.rstrip(b'\r\n')
+            pos = 0
+            literal = None
+            while pos < len(line):
+                m = TOKEN.match(line, pos)
+                if not m:
+                    break
+                tok = m.group(1)
+                pos = m.end()
+                if tok == b'(':
+                    new = []
+                    stack[-1].append(new)
+                    stack.append(new)
+                elif tok == b')':
+                    stack.pop()
+                elif tok.startswith(b'{') and tok.endswith(b'}'):
+                    literal = int(tok[1:-1].rstrip(b'+'))
+                elif tok.startswith(b'"'):
+                    stack[-1].append(
+                        re.sub(rb'\\(.)', rb'\1', tok[1:-1]).decode())
+                else:
+                    stack[-1].append(tok.decode())
+            if literal is None:
+                return tokens
+            self.send(b'+ go ahead\r\n')
+            data = self.rfile.read(literal)
+            self.server.stats.received(literal)
+            stack[-1].append(data.decode('utf-8'))
+
+    def handle(self):
+        self.selected = False
+        self.send(b'* OK [CAPABILITY IMAP4rev1 IDLE MOVE UIDPLUS] ready\r\n')
+        while True:
+            try:
+                tokens = self.readCommand()
+            except (ConnectionError, ssl.SSLError, OSError):
+                return
+            if not tokens:
+                return
+            tag, cmd, args = tokens[0], tokens[1].upper(), tokens[2:]
+            uid = False
+            if cmd == 'UID':
+                uid = True
+                cmd, args = args[0].upper(), args[1:]
+            self.server.stats.count(('UID ' if uid else '') + cmd)
+            handler = getattr(self, 'do_' + cmd, None)
+            if handler is None:
+                self.send(f'{tag} BAD unknown command\r\n')
+                continue
+            if handler(tag, args, uid) is False:
+                return
+
+    def do_CAPABILITY(self, tag, args, uid):
+        self.send('* CAPABILITY IMAP4rev1 IDLE MOVE UIDPLUS\r\n')
+        self.send(f'{tag} OK done\r\n')
+
+    def do_NOOP(self, tag, args, uid):
+        self.reportExists()
+        self.send(f'{tag} OK done\r\n')
+
+    def do_LOGIN(self, tag, args, uid):
+        self.send(f'{tag} OK logged in\r\n')
+
+    def do_LOGOUT(self, tag, args, uid):
+        self.send('* BYE bye\r\n')
+        self.send(f'{tag} OK done\r\n')
+        return False
+
+    def do_SELECT(self, tag, args, uid):
+        box = self.server.mailbox
+        with box.lock:
+            self.known = len(box.messages)
+            self.send(f'* {len(box.messages)} EXISTS\r\n')
+            self.send('* 0 RECENT\r\n')
+            self.send(f'* OK [UIDVALIDITY {box.uidvalidity}] ok\r\n')
+            self.send(f'* OK [UIDNEXT {box.uidnext}] ok\r\n')
+        self.selected = True
+        self.send(f'{tag} OK [READ-WRITE] selected\r\n')
+
+    do_EXAMINE = do_SELECT
+
+    def do_STATUS(self, tag, args, uid):
+        box = self.server.mailbox
+        with box.lock:
+            self.send(
+                f'* STATUS INBOX (MESSAGES {len(box.messages)} '
+                f'UIDNEXT {box.uidnext} UIDVALIDITY {box.uidvalidity})\r\n')
+        self.send(f'{tag} OK done\r\n')
+
+    def reportExists(self):
+        box = self.server.mailbox
+        with box.lock:
+            if len(box.messages) != getattr(self, 'known', 0):
+                self.known = len(box.messages)
+                self.send(f'* {self.known} EXISTS\r\n')
+
+    def do_IDLE(self, tag, args, uid):
+        self.send('+ idling\r\n')
+        box = self.server.mailbox
+        done = threading.Event()
+
+        def watch():
+            while not done.is_set():
+                with box.lock:
+                    box.lock.wait(0.2)
+                    if done.is_set():
+                        return
+                try:
+                    self.reportExists()
+                except OSError:
+                    return
+
+        t = threading.Thread(target=watch, daemon=True)
+        t.start()
+        line = self.readline()
+        done.set()
+        with box.lock:
+            box.lock.notify_all()
+        t.join()
+        if not line:
+            return False
+        self.send(f'{tag} OK idle done\r\n')
+
+    def do_EXPUNGE(self, tag, args, uid):
+        self.expunge(report=True)
+        self.send(f'{tag} OK done\r\n')
+
+    def do_CLOSE(self, tag, args, uid):
+        self.expunge(report=False)
+        self.selected = False
+        self.send(f'{tag} OK done\r\n')
+
+    def expunge(self, report):
+        box = self.server.mailbox
+        with box.lock:
+            seq = 1
+            for m in list(box.messages):
+                if '\\Deleted' in m['flags']:
+                    box.messages.remove(m)
+                    if report:
+                        self.send(f'* {seq} EXPUNGE\r\n')
+                else:
+                    seq += 1
+            self.known = len(box.messages)
+
+    def selectMessages(self, setspec, uid):
+        box = self.server.mailbox
+        msgs = box.messages
+        if uid:
+            maximum = msgs[-1]['uid'] if msgs else 0
+            ranges = parseSet(setspec, maximum)
+            return [(i + 1, m) for i, m in enumerate(msgs)
+                    if inSet(ranges, m['uid'])]
+        ranges = parseSet(setspec, len(msgs))
+        return [(i + 1, m) for i, m in enumerate(msgs) if inSet(ranges, i + 1)]
+
+    def match(self, m, seq, crit, pos):
+        """Evaluate one search key at pos, return (result, newpos)."""
+        key = crit[pos]
+        if isinstance(key, list):
+            res = True
+            p = 0
+            while p < len(key):
+                r, p = self.match(m, seq, key, p)
+                res = res and r
+            return res, pos + 1
+        k = key.upper()
+        if k == 'ALL':
+            return True, pos + 1
+        if k in ('SUBJECT', 'FROM'):
+            if m['subject'] is None:
+                m['subject'] = headerText(m['raw'], 'Subject').lower()
+                m['from'] = headerText(m['raw'], 'From').lower()
+            field = m['subject'] if k == 'SUBJECT' else m['from']
+            return crit[pos + 1].lower() in field, pos + 2
+        if k == 'OR':
+            a, p = self.match(m, seq, crit, pos + 1)
+            b, p = self.match(m, seq, crit, p)
+            return a or b, p
+        if k == 'NOT':
+            a, p = self.match(m, seq, crit, pos + 1)
+            return not a, p
+        if k == 'UID':
+            box = self.server.mailbox
+            maximum = box.messages[-1]['uid'] if box.messages else 0
+            return inSet(parseSet(crit[pos + 1], maximum), m['uid']), pos + 2
+        if k == 'DELETED':
+            return '\\Deleted' in m['flags'], pos + 1
+        if k == 'UNDELETED':
+            return '\\Deleted' not in m['flags'], pos + 1
+        if k == 'SEEN':
+            return '\\Seen' in m['flags'], pos + 1
+        if k == 'UNSEEN':
+            return '\\Seen' not in m['flags'], pos + 1
+        return inSet(parseSet(key, len(self.server.mailbox.messages)),
+                     seq), pos + 1
+
+    def do_SEARCH(self, tag, args, uid):
+        if args and args[0].upper() == 'CHARSET':
+            args = args[2:]
+        box = self.server.mailbox
+        found = []
+        with box.lock:
+            for seq, m in enumerate(box.messages, 1):
+                ok = True
+                p = 0
+                while p < len(args):
+                    r, p = self.match(m, seq, args, p)
+                    ok = ok and r
+                if ok:
+                    found.append(str(m['uid'] if uid else seq))
+        self.send(('* SEARCH ' + ' '.join(found)).rstrip() + '\r\n')
+        self.send(f'{tag} OK done\r\n')
+
+    def do_FETCH(self, tag, args, uid):
+        setspec, items = args[0], args[1]
+        if not isinstance(items, list):
+            items = [items]
+        # flatten BODY.PEEK[HEADER.FIELDS (A B)] which the tokenizer splits
+        names = []
+        i = 0
+        while i < len(items):
+            it = items[i]
+            if isinstance(it, str) and it.upper().endswith('HEADER.FIELDS'):
+                fields = items[i + 1]
+                tail = items[i + 2] if i + 2 < len(items) and \
+                    isinstance(items[i + 2], str) and \
+                    items[i + 2].startswith(']') else ''
+                names.append(('FIELDS', it, fields, tail))
+                i += 3 if tail else 2
+            else:
+                names.append(it.upper())
+                i += 1
+        box = self.server.mailbox
+        with box.lock:
+            selected = self.selectMessages(setspec, uid)
+        for seq, m in selected:
+            parts = []
+            if uid or 'UID' in names:
+                parts.append(f'UID {m["uid"]}')
+            for name in names:
+                if isinstance(name, tuple):
+                    fields = [f.lower() for f in name[2]]
+                    head = m['raw'].split(b'\r\n\r\n', 1)[0]
+                    head = head.replace(b'\r\n', b'\n')
+                    out = []
+                    for line in re.split(rb'\n(?=\S)', head):
+                        key = line.split(b':', 1)[0].decode().lower()
+                        if key in fields:
+                            out.append(line.replace(b'\n', b'\r\n'))
+                    data = b'\r\n'.join(out) + b'\r\n\r\n'
+                    label = ('BODY[HEADER.FIELDS (' +
+                             ' '.join(name[2]).upper() + ')]')
+                    parts.append((label, data))
+                elif name == 'UID':
+                    continue
+                elif name == 'FLAGS':
+                    parts.append(f'FLAGS ({" ".join(sorted(m["flags"]))})')
+                elif name == 'RFC822.SIZE':
+                    parts.append(f'RFC822.SIZE {len(m["raw"])}')
+                elif name in ('RFC822', 'BODY[]', 'BODY.PEEK[]'):
+                    label = 'RFC822' if name == 'RFC822' else 'BODY[]'
+                    parts.append((label, m['raw']))
+                    if name != 'BODY.PEEK[]':
+                        m['flags'].add('\\Seen')
+                elif name in ('RFC822.HEADER', 'BODY.PEEK[HEADER]',
+                              'BODY[HEADER]'):
+                    head = m['raw'].split(b'\r\n\r\n', 1)[0] + b'\r\n\r\n'
+                    parts.append(('RFC822.HEADER', head))
+            # emit: literals must close a line
+            out = f'* {seq} FETCH ('.encode()
+            first = True
+            for p in parts:
+                if not first:
+                    out += b' '
+                first = False
+                if isinstance(p, tuple):
+                    out += f'{p[0]} {{{len(p[1])}}}\r\n'.encode() + p[1]
+                else:
+                    out += p.encode()
+            out += b')\r\n'
+            self.send(out)
+        self.send(f'{tag} OK done\r\n')
+
+    def do_STORE(self, tag, args, uid):
+        setspec, op, flags = args[0], args[1].upper(), args[2]
+        if not isinstance(flags, list):
+            flags = [flags]
+        box = self.server.mailbox
+        with box.lock:
+            for seq, m in self.selectMessages(setspec, uid):
+                if op.startswith('+'):
+                    m['flags'].update(flags)
+                elif op.startswith('-'):
+                    m['flags'].difference_update(flags)
+                else:
+                    m['flags'] = set(flags)
+                if not op.endswith('.SILENT'):
+                    self.send(f'* {seq} FETCH (FLAGS '
+                              f'({" ".join(sorted(m["flags"]))}))\r\n')
+        self.send(f'{tag} OK done\r\n')
+
+    def do_COPY(self, tag, args, uid):
+        box = self.server.mailbox
+        with box.lock:
+            for seq, m in self.selectMessages(args[0], uid):
+                box.folders.setdefault(args[1], []).append(m['raw'])
+        self.send(f'{tag} OK done\r\n')
+
+    def do_MOVE(self, tag, args, uid):
+        box = self.server.mailbox
+        if not self.server.allow_move:
+            self.send(f'{tag} BAD MOVE not supported\r\n')
+            return
+        with box.lock:
+            for seq, m in self.selectMessages(args[0], uid):
+                box.folders.setdefault(args[1], []).append(m['raw'])
+                m['flags'].add('\\Deleted')
+            self.expunge(report=True)
+        self.send(f'{tag} OK done\r\n')
+
+    def do_CREATE(self, tag, args, uid):
+        self.server.mailbox.folders.setdefault(args[0], [])
+        self.send(f'{tag} OK done\r\n')
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+
+    def send(self, line):
+        data = (line + '\r\n').encode()
+        self.server.stats.sent(len(data))
+        self.wfile.write(data)
+        self.wfile.flush()
+
+    def readline(self):
+        line = self.rfile.readline()
+        self.server.stats.received(len(line))
+        return line
+
+    def handle(self):
+        self.send('220 localhost ESMTP fake')
+        mail_from, rcpts = None, []
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            text = line.decode('utf-8', 'replace').rstrip('\r\n')
+            cmd = text.split(' ', 1)[0].upper()
+            self.server.stats.count(cmd)
+            if cmd in ('EHLO', 'HELO'):
+                for line in ('250-localhost', '250-STARTTLS',
+                             '250-AUTH PLAIN LOGIN', '250 8BITMIME'):
+                    self.send(line)
+            elif cmd == 'STARTTLS':
+                self.send('220 go ahead')
+                conn = self.server.ssl_context.wrap_socket(
+                    self.connection, server_side=True)
+                self.connection = conn
+                self.rfile = conn.makefile('rb')
+                self.wfile = conn.makefile('wb', buffering=0)
+            elif cmd == 'AUTH':
+                self.send('235 ok')
+            elif cmd == 'MAIL':
+                mail_from, rcpts = text[10:].strip('<> '), []
+                self.send('250 ok')
+            elif cmd == 'RCPT':
+                rcpt = text[8:].strip('<> ')
+                if rcpt in self.server.reject:
+                    self.send('550 no such user')
+                    continue
+                rcpts.append(rcpt)
+                self.send('250 ok')
+            elif cmd == 'DATA':
+                self.send('354 go')
+                chunks = []
+                while True:
+                    d = self.readline()
+                    if d in (b'.\r\n', b''):
+                        break
+                    if d.startswith(b'..'):
+                        d = d[1:]
+                    chunks.append(d)
+                with self.server.lock:
+                    self.server.received.append(
+                        (mail_from, rcpts, b''.join(chunks)))
+                self.send('250 queued')
+            elif cmd == 'RSET' or cmd == 'NOOP':
+                self.send('250 ok')
+            elif cmd == 'QUIT':
+                self.send('221 bye')
+                return
+            else:
+                self.send('502 not implemented')
+
+
+class ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeIMAPServer(ThreadingTCPServer):
+
+    def __init__(self, certfile, keyfile, mailbox=None, host='127.0.0.1',
+                 port=0, allow_move=True):
+        super().__init__((host, port), IMAPHandler)
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(certfile, keyfile)
+        self.socket = ctx.wrap_socket(self.socket, server_side=True)
+        self.mailbox = mailbox or Mailbox()
+        self.stats = Stats()
+        self.allow_move = allow_move
+
+
+class FakeSMTPServer(ThreadingTCPServer):
+
+    def __init__(self, certfile, keyfile, host='127.0.0.1', port=0):
+        super().__init__((host, port), SMTPHandler)
+        self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.ssl_context.load_cert_chain(certfile, keyfile)
+        self.stats = Stats()
+        self.lock = threading.Lock()
+        self.received = []
+        self.reject = set()
+
+
+def serve(server):
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    return server
+
+
+def makeMessage(subject, sender, body='hi', attachment_size=0,
+                to='lists@example.com'):
+    """Return a raw RFC 5322 message, built without the email package.
+
+    Seeding 100k messages through MIMEMultipart takes minutes, so the
+    message is put together from a template.
+    """
+    if not subject.isascii():
+        subject = Header(subject, 'utf-8').encode()
+    head = (
+        f"From: {sender}\r\nTo: {to}\r\nSubject: {subject}\r\n"
+        f"MIME-Version: 1.0\r\n"
+    )
+
+    if not attachment_size:
+        return (
+            head + "Content-Type: text/plain; charset=utf-8\r\n\r\n"
+            f"{body}\r\n"
+        ).encode()
+
+    return (
+        head + f'Content-Type: multipart/mixed; boundary="{BOUNDARY}"\r\n'
+        f"\r\n--{BOUNDARY}\r\n"
+        f"Content-Type: text/plain; charset=utf-8\r\n\r\n{body}\r\n"
+        f"--{BOUNDARY}\r\n"
+        f"Content-Type: application/octet-stream; name=a.bin\r\n"
+        f"Content-Transfer-Encoding: base64\r\n\r\n"
+    ).encode() + attachment(attachment_size) + f"--{BOUNDARY}--\r\n".encode()
+
+
+@functools.lru_cache(maxsize=None)
+def attachment(size):
+    return base64.encodebytes(b'x' * size).replace(b'\n', b'\r\n')